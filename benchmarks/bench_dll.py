@@ -0,0 +1,641 @@
+'''Benchmarks for the dll module
+
+Run from the repository root:
+
+	python benchmarks/bench_dll.py [-o FILE] [-s SIZE ...] [name ...]
+
+The benchmarks use a small C library compiled with the system compiler (set CC to choose another one), and synthetic
+descriptors of increasing size that bind many symbols to it. Each result is one JSON object per line, and the first
+line describes the environment, so the output of different runs can be compared.
+'''
+
+from __future__ import print_function
+
+import sys, os
+import json
+import argparse
+import importlib
+import py_compile
+import platform
+import array
+import atexit
+import shutil
+import tempfile
+import threading
+import timeit
+import zlib
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import dll
+
+# Registered benchmarks, in the order they are run
+benchmarks = []
+
+def benchmark(f):
+	'''Register a benchmark function'''
+	benchmarks.append(f)
+	return f
+
+def measure(f, repeat=5, number=None):
+	'''Return the best time of a single call to "f" in seconds'''
+	timer = timeit.Timer(f)
+	if number is None:
+		number, _ = timer.autorange() if hasattr(timer, 'autorange') else (100, None)
+	return min(timer.repeat(repeat=repeat, number=number)) / number
+
+# Output of the results
+output = sys.stdout
+
+# Sizes of the synthetic descriptors
+sizes = [10, 100, 1000, 10000, 50000]
+
+def report(name, **values):
+	values['name'] = name
+	output.write(json.dumps(values, sort_keys=True) + '\n')
+	output.flush()
+
+# ------------------------------------------------------------ #
+#	Benchmark library
+# ------------------------------------------------------------ #
+
+# Source of the benchmark library, compiled on first use
+source = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchlib.c')
+
+# Descriptor of the benchmark library
+descriptor = {
+	'type': 'library',
+	'version': dll.Loader.FORMAT_VERSION,
+	'library': {
+		'version': '1.0',
+		'description': 'Benchmark library',
+		'define': {
+			'type': [
+				['point', 'struct', ['x: F64', 'y: F64']],
+				['number', 'union', ['i: I64', 'f: F64']],
+				['tagged', 'struct', ['tag: I32', 'value: number']],
+			],
+		},
+		'export': {
+			'function': [
+				['noop', None, '() -> N'],
+				['add_i32', None, 'I32, I32 -> I32'],
+				['scale_f64', None, 'F64, F64 -> F64'],
+				['checksum', None, 'U8*, UZ -> U32'],
+				['point_norm2', None, 'point* -> F64'],
+				['point_dot', None, 'point, point -> F64'],
+				['for_each_block', None, 'U8*, UZ, UZ, (U8*, UZ -> I32) -> I32'],
+			],
+			'variable': [
+				['counter', None, 'I32'],
+				['points', None, 'point[4]'],
+			],
+		},
+	},
+}
+
+def workdir(cache=[]):
+	'''Temporary directory for the benchmark files, removed at exit'''
+	if not cache:
+		cache.append(tempfile.mkdtemp(prefix='bench_dll-'))
+		atexit.register(shutil.rmtree, cache[0], True)
+	return cache[0]
+
+def build(cache=[]):
+	'''Compile the benchmark library with the system compiler, and write its descriptor. Returns the descriptor name'''
+	if not cache:
+		root = workdir()
+		compiler = os.environ.get('CC', 'cc')
+		subprocess.check_call([compiler, '-shared', '-fPIC', '-O2', '-o', os.path.join(root, 'benchlib.so'), source])
+		filename = os.path.join(root, 'benchlib.json')
+		with open(filename, 'w') as file:
+			json.dump(descriptor, file, indent=1)
+		cache.append(filename)
+	return cache[0]
+
+def synthetic(size, cache={}):
+	'''
+	Write a descriptor with "size" symbols for the benchmark library. A fifth of the symbols are types (aliases and
+	structures), the rest are functions bound to the few real symbols of the library. Returns the descriptor name.
+	'''
+	if size not in cache:
+		build()
+		types, functions = [], []
+		for index in range(size):
+			if index % 10 == 0:
+				types.append(['alias%d' % index, '=', 'I32*'])
+			elif index % 10 == 5:
+				types.append(['struct%d' % index, 'struct', ['x: F64', 'y: I32', 'next: struct%d*' % index]])
+			elif index % 2:
+				functions.append(['add%d' % index, 'add_i32', 'a: I32, b: I32 -> I32'])
+			else:
+				functions.append(['checksum%d' % index, 'checksum', 'data: U8*, size: UZ -> U32'])
+		config = {
+			'type': 'library',
+			'version': dll.Loader.FORMAT_VERSION,
+			'binary': 'benchlib.so',
+			'library': {
+				'version': '1.0',
+				'description': 'Synthetic library with %d symbols' % size,
+				'define': {'type': types},
+				'export': {'function': functions},
+			},
+		}
+		filename = cache[size] = os.path.join(workdir(), 'synthetic%d.json' % size)
+		with open(filename, 'w') as file:
+			json.dump(config, file, indent=1)
+	return cache[size]
+
+# ------------------------------------------------------------ #
+#	Type parser
+# ------------------------------------------------------------ #
+
+def deep_type(depth):
+	'''Nested function pointers: ((I32, P -> N)*, P -> N)* ...'''
+	text = 'I32'
+	for _ in range(depth):
+		text = '(%s, P -> N)*' % text
+	return text
+
+def wide_type(width):
+	'''Function with many parameters: I32, I32, ... -> I32'''
+	return ', '.join(['I32'] * width) + ' -> I32'
+
+@benchmark
+def parsetype():
+	for shape, make, sizes in (('deep', deep_type, (10, 20, 40, 80, 160)), ('wide', wide_type, (10, 100, 1000, 10000))):
+		for size in sizes:
+			text = make(size)
+			tokens = len(dll.Types.tokenize(text))
+			seconds = measure(lambda: dll.Types.parsetype(text))
+			report('parsetype', shape=shape, size=size, tokens=tokens, seconds=seconds, ns_per_token=seconds * 1e9 / tokens)
+
+@benchmark
+def build_types():
+	texts = ['I32', 'U8*', 'P, IZ -> I32', '(I32, P -> N)*', 'F64[16]', 'U8**, UZ* -> I32']
+	parsed = [dll.Types.parsetype(text) for text in texts]
+	
+	def cold():
+		types = dll.Types(cachesize=0)
+		for x in parsed:
+			types.build(x)
+	
+	def warm(types=dll.Types()):
+		for x in parsed:
+			types.build(x)
+	
+	def compiled(types=dll.Types()):
+		for text in texts:
+			types.compile(text)
+	
+	for mode, f in (('uncached', cold), ('cached', warm), ('compile_cached', compiled)):
+		report('build', mode=mode, types=len(texts), seconds=measure(f) / len(texts))
+
+# ------------------------------------------------------------ #
+#	Loading
+# ------------------------------------------------------------ #
+
+@benchmark
+def load():
+	for size in sizes:
+		filename = synthetic(size)
+		number = max(1, 1000 // size)
+		for compiled in (False, True):
+			# Load once to write the compiled cache
+			dll.Loader(compiled=compiled).load(filename)
+			for delayed in (False, True):
+				seconds = measure(lambda: dll.Loader(compiled=compiled).load(filename, delayed=delayed), repeat=3, number=number)
+				report('load', size=size, compiled=compiled, delayed=delayed, seconds=seconds, us_per_symbol=seconds * 1e6 / size)
+
+@benchmark
+def includes():
+	'''Libraries that define the same structures themselves, compared with libraries that include them from a fragment'''
+	root = workdir()
+	build()
+	structs = [['shared%d' % index, 'struct', ['x: F64', 'y: I32', 'next: shared%d*' % index]] for index in range(100)]
+	with open(os.path.join(root, 'shared.json'), 'w') as file:
+		json.dump({'type': 'types', 'version': dll.Loader.FORMAT_VERSION, 'define': {'type': structs}}, file)
+	for included in (False, True):
+		filenames = []
+		for index in range(10):
+			filename = os.path.join(root, 'includes%d_%d.json' % (included, index))
+			library = {'version': '1.0', 'description': 'Shared types', 'define': {'type': [] if included else structs}, 'export': {}}
+			if included:
+				library['include'] = ['shared.json']
+			with open(filename, 'w') as file:
+				json.dump({'type': 'library', 'version': dll.Loader.FORMAT_VERSION, 'binary': 'benchlib.so', 'library': library}, file)
+			filenames.append(filename)
+		loader = dll.Loader(compiled=False)
+		def load():
+			return [loader.load(filename, private=True) for filename in filenames]
+		seconds = measure(load, repeat=3, number=1)
+		distinct = len(set(id(library.shared0) for library in load()))
+		report('includes', included=included, libraries=len(filenames), types=len(structs), seconds=seconds, distinct_classes=distinct)
+
+@benchmark
+def check_symbols():
+	'''Delayed loads, with and without looking up all the exported symbols at load time'''
+	for size in sizes:
+		filename = synthetic(size)
+		for check in (False, True):
+			loader = dll.Loader()
+			loader.check_symbols = check
+			seconds = measure(lambda: loader.load(filename, delayed=True, private=True), repeat=3, number=max(1, 1000 // size))
+			report('check_symbols', size=size, check=check, seconds=seconds, us_per_symbol=seconds * 1e6 / size)
+
+@benchmark
+def first_access():
+	for size in sizes:
+		filename = synthetic(size)
+		loader = dll.Loader()
+		names = [entry[0] for entry in json.load(open(filename))['library']['export']['function']]
+		def resolve():
+			library = loader.load(filename, delayed=True, private=True)
+			for name in names:
+				getattr(library, name)
+		seconds = measure(resolve, repeat=3, number=1)
+		loaded = measure(lambda: loader.load(filename, delayed=True, private=True), repeat=3, number=1)
+		report('first_access', size=size, exports=len(names), seconds=(seconds - loaded) / len(names))
+
+@benchmark
+def cold_threads():
+	'''
+	Threads resolving the same delayed exports at once, each in another order. Also a stress test: every thread must
+	get the same objects, and each export must be resolved once.
+	'''
+	switchinterval = sys.getswitchinterval() if hasattr(sys, 'getswitchinterval') else None
+	if switchinterval is not None:
+		# Switch threads as often as possible, to expose races
+		sys.setswitchinterval(1e-6)
+	try:
+		for size in sizes:
+			filename = synthetic(size)
+			names = [entry[0] for entry in json.load(open(filename))['library']['export']['function']]
+			names += [entry[0] for entry in json.load(open(filename))['library']['define']['type']]
+			for count in (1, 16):
+				loader = dll.Loader()
+				library = loader.load(filename, delayed=True, private=True)
+				results = [None] * count
+				def work(index):
+					shift = index * len(names) // count
+					results[index] = dict((name, library[name]) for name in names[shift:] + names[:shift])
+				threads = [threading.Thread(target=work, args=(index,)) for index in range(count)]
+				start = timeit.default_timer()
+				for thread in threads:
+					thread.start()
+				for thread in threads:
+					thread.join()
+				seconds = timeit.default_timer() - start
+				for name in names:
+					if len(set(id(result[name]) for result in results)) != 1:
+						raise AssertionError('"{name}": Resolved more than once'.format(name=name))
+				report('cold_threads', size=size, threads=count, seconds=seconds, us_per_symbol=seconds * 1e6 / len(names))
+	finally:
+		if switchinterval is not None:
+			sys.setswitchinterval(switchinterval)
+
+@benchmark
+def warmup():
+	'''First access of delayed exports, with and without resolving the exports of a usage profile in the background'''
+	for size in sizes:
+		filename = synthetic(size)
+		names = [entry[0] for entry in json.load(open(filename))['library']['export']['function']]
+		
+		# Record the profile of a run that uses every export
+		loader = dll.Loader()
+		loader.profile = True
+		library = loader.load(filename, delayed=True, private=True)
+		for name in names:
+			getattr(library, name)
+		loader.save_profile(library)
+		
+		for warm in (False, True):
+			loader = dll.Loader()
+			loader.warmup = warm
+			def resolve():
+				library = loader.load(filename, delayed=True, private=True)
+				library._warmup.wait()
+				start = timeit.default_timer()
+				for name in names:
+					getattr(library, name)
+				return timeit.default_timer() - start
+			seconds = min(resolve() for _ in range(3))
+			report('warmup', size=size, warmup=warm, seconds=seconds / len(names))
+		os.remove(loader.profile_filename(filename))
+
+@benchmark
+def generated():
+	'''Import time of the modules written by dll.generate, to compare with "load"'''
+	root = workdir()
+	if root not in sys.path:
+		sys.path.insert(0, root)
+	for size in sizes:
+		name = 'synthetic%d_binding' % size
+		filename = os.path.join(root, name + '.py')
+		with open(filename, 'w') as file:
+			file.write(dll.generate(synthetic(size)))
+		
+		# Compile explicitly, writing bytecode may be disabled
+		py_compile.compile(filename, doraise=True)
+		if hasattr(importlib, 'invalidate_caches'):
+			importlib.invalidate_caches()
+		def load():
+			sys.modules.pop(name, None)
+			importlib.import_module(name)
+		seconds = measure(load, repeat=3, number=max(1, 1000 // size))
+		report('generated', size=size, seconds=seconds, us_per_symbol=seconds * 1e6 / size)
+
+# ------------------------------------------------------------ #
+#	Calls
+# ------------------------------------------------------------ #
+
+@benchmark
+def call():
+	library = dll.Loader().load(build())
+	data = bytearray(64)
+	array_data = (dll.ctypes.c_uint8 * 64)()
+	p = library.point(3.0, 4.0)
+	calls = (
+		('noop', lambda f=library.noop: f()),
+		('scalar_i32', lambda f=library.add_i32: f(1, 2)),
+		('scalar_f64', lambda f=library.scale_f64: f(1.5, 2.0)),
+		('pointer_ctypes', lambda f=library.checksum: f(array_data, 64)),
+		('pointer_buffer', lambda f=library.checksum: f(data, 64)),
+		('struct_pointer', lambda f=library.point_norm2: f(p)),
+		('struct_value', lambda f=library.point_dot: f(p, p)),
+	)
+	for kind, f in calls:
+		report('call', kind=kind, seconds=measure(f))
+
+@benchmark
+def gil():
+	'''Functions that hold the GIL during calls, and functions that release it, called from several threads at once'''
+	library = dll.Loader(compiled=False).load(build())
+	loader = library._loader
+	data = bytearray(1 << 20)
+	functions = (
+		('add_i32', 'I32, I32 -> I32', (1, 2), 200000),
+		('checksum', 'U8*, UZ -> U32', (data, len(data)), 400),
+	)
+	for name, text, args, calls in functions:
+		for mode in ('release', 'hold'):
+			function = loader.bind_function(library, name, name, loader.types.compile(text), gil=mode)
+			for count in (1, 4):
+				def work():
+					for _ in range(calls // count):
+						function(*args)
+				def run():
+					threads = [threading.Thread(target=work) for _ in range(count)]
+					for thread in threads:
+						thread.start()
+					for thread in threads:
+						thread.join()
+				seconds = measure(run, repeat=3, number=1)
+				report('gil', function=name, gil=mode, threads=count, seconds=seconds / calls)
+
+@benchmark
+def outparams():
+	'''Out parameters passed by the caller, compared with out parameters declared in the "params" option'''
+	library = dll.Loader(compiled=False).load(build())
+	loader, int32 = library._loader, dll.ctypes.c_int32
+	functype = loader.types.compile('I32, I32, I32*, I32* -> N')
+	plain = loader.bind_function(library, 'divmod_i32', 'divmod_i32', functype)
+	declared = loader.bind_function(library, 'divmod_i32', 'divmod_i32', functype, params={'2': 'out', '3': 'out'})
+	def manual():
+		quotient, remainder = int32(), int32()
+		plain(7, 2, quotient, remainder)
+		return quotient.value, remainder.value
+	calls = (
+		('manual', manual),
+		('declared', lambda: declared(7, 2)),
+	)
+	for kind, f in calls:
+		report('outparams', kind=kind, seconds=measure(f))
+
+@benchmark
+def processes():
+	'''Calls from 4 threads, serialized by a lock in this process, compared with calls in worker processes'''
+	filename = build()
+	library = dll.Loader(compiled=False).load(filename)
+	lock = threading.Lock()
+	def serialized(data, size):
+		with lock:
+			return library.checksum(data, size)
+	for size in (64, 1 << 20):
+		data = bytearray(size)
+		calls = max(4, (1 << 22) // size)
+		for count in (0, 1, 4):
+			if count:
+				workers = dll.Loader(compiled=False).load(filename, processes=count)
+				function = workers.checksum
+				function(data, size)
+			else:
+				function = serialized
+			def work():
+				for _ in range(calls // 4):
+					function(data, size)
+			def run():
+				threads = [threading.Thread(target=work) for _ in range(4)]
+				for thread in threads:
+					thread.start()
+				for thread in threads:
+					thread.join()
+			report('processes', size=size, processes=count, seconds=measure(run, repeat=3, number=1) / calls)
+			if count:
+				workers._close()
+
+@benchmark
+def callback():
+	'''Calls of a function that calls back into python with each block of a buffer, to compute its CRC'''
+	library = dll.Loader(compiled=False).load(build())
+	functype = library._loader.types.compile('U8*, UZ -> I32')
+	data = bytearray(1 << 20)
+	
+	def pointer(block, size):
+		return zlib.crc32(dll.ctypes.string_at(block, size)) & 0xFFFF
+	
+	def view(block, size):
+		return zlib.crc32(block) & 0xFFFF
+	
+	for block in (64, 65536):
+		count = len(data) // block
+		callbacks = (
+			# A new trampoline for each call, and ctypes pointers
+			('new', lambda f=library.for_each_block: f(data, len(data), block, functype(pointer))),
+			# A cached trampoline, and ctypes pointers
+			('cached', lambda f=library.for_each_block: f(data, len(data), block, pointer)),
+			# A cached trampoline, and memoryviews
+			('buffers', lambda f=library.for_each_block, c=library._callbacks.get(functype, view, buffers=True): f(data, len(data), block, c)),
+		)
+		for kind, f in callbacks:
+			report('callback', kind=kind, block=block, seconds=measure(f, repeat=3) / count)
+
+@benchmark
+def pool():
+	'''Calls with a new scratch buffer, compared with buffers from the pool of the loader'''
+	library = dll.Loader().load(build())
+	f, pool, uint8 = library.checksum, library._pool, dll.ctypes.c_uint8
+	for size in (64, 4096, 65536):
+		def taken():
+			buffer = pool.take(uint8, size)
+			f(buffer, size)
+			pool.release(buffer)
+		def leased():
+			with pool.borrow(size) as lease:
+				f(lease, size)
+		calls = (
+			('new', lambda: f((uint8 * size)(), size)),
+			('take', taken),
+			('lease', leased),
+		)
+		for kind, g in calls:
+			report('pool', kind=kind, size=size, seconds=measure(g))
+
+@benchmark
+def aligned():
+	'''Calls with data copied to new aligned memory each time, compared with aligned memory. Checks the alignment first'''
+	library = dll.Loader().load(build())
+	f, pool, uint8, addressof = library.checksum, library._pool, dll.ctypes.c_uint8, dll.ctypes.addressof
+	
+	# Addresses of the buffers of each kind, for sizes that are not a multiple of the alignment
+	for align in (16, 32, 64, 128, 256, 4096):
+		for size in (1, 100, 5000):
+			buffers = [
+				('alloc', library._alloc('U8', size, align=align)),
+				('take', pool.take(uint8, size, align=align)),
+			]
+			with pool.borrow(size, align=align) as lease:
+				f(lease, size)
+				buffers.append(('lease', lease.buffer))
+				for kind, buffer in buffers:
+					if addressof(buffer) % align:
+						raise AssertionError('"{kind}": Buffer of {size} bytes at {address:#x} is not aligned to {align} bytes'.format(
+							kind=kind, size=size, address=addressof(buffer), align=align))
+			pool.release(buffers[1][1])
+	
+	for size in (64, 4096, 65536):
+		data = (uint8 * size)()
+		def copied():
+			buffer = dll.Utils.aligned(uint8, size, 64)
+			dll.ctypes.memmove(buffer, data, size)
+			f(buffer, size)
+		def taken():
+			buffer = pool.take(uint8, size, align=64)
+			f(buffer, size)
+			pool.release(buffer)
+		def leased():
+			with pool.borrow(size, align=64) as lease:
+				f(lease, size)
+		buffer = library._alloc('U8', size, align=64)
+		calls = (
+			('copy', copied),
+			('alloc', lambda: f(buffer, size)),
+			('take', taken),
+			('lease', leased),
+		)
+		for kind, g in calls:
+			report('aligned', kind=kind, size=size, seconds=measure(g))
+
+@benchmark
+def batch():
+	library = dll.Loader(compiled=False).load(build())
+	for rows in (100, 10000, 1000000):
+		values = array.array('d', range(rows))
+		out = array.array('d', bytes(8 * rows) if str is not bytes else '\0' * (8 * rows))
+		
+		def loop():
+			f = library.scale_f64
+			for i, value in enumerate(values):
+				out[i] = f(value, 2.0)
+		
+		number = max(1, 100000 // rows)
+		plain = measure(loop, repeat=3, number=number)
+		batched = measure(lambda: library._batch('scale_f64', values, 2.0, out=out), repeat=3, number=number)
+		if list(library._batch('scale_f64', (dll.ctypes.c_double * rows)(*values), 2.0)) != list(out):
+			raise AssertionError('Batched results of a ctypes array differ from the plain calls')
+		report('batch', rows=rows, loop_seconds=plain, batch_seconds=batched, speedup=plain / batched)
+	
+	# Records of a buffer passed to a pointer parameter
+	for rows in (100, 10000):
+		size = 64
+		data = bytearray(range(256)) * (rows * size // 256)
+		out = array.array('I', [0]) * rows
+		
+		def loop():
+			f, view = library.checksum, memoryview(data)
+			for i in range(rows):
+				out[i] = f(view[i * size:(i + 1) * size], size)
+		
+		number = max(1, 10000 // rows)
+		plain = measure(loop, repeat=3, number=number)
+		batched = measure(lambda: library._batch('checksum', data, size, out=out, stride=size), repeat=3, number=number)
+		if list(out) != list(library._batch('checksum', data, size, stride=size)):
+			raise AssertionError('Batched checksums differ from the plain calls')
+		report('batch', records=rows, loop_seconds=plain, batch_seconds=batched, speedup=plain / batched)
+
+@benchmark
+def structview():
+	library = dll.Loader(compiled=False).load(build())
+	
+	# Columns of a union member, and of an array of unions
+	items = (library.tagged * 10)()
+	for index, item in enumerate(items):
+		item.tag, item.value.i = index, index * 10
+	if list(dll.StructView(library.tagged, items).value.i) != [x.value.i for x in items]:
+		raise AssertionError('Columns of a union member differ from the structures')
+	if list(dll.StructView(library.number, (library.number * 10)(*[x.value for x in items])).i) != [x.value.i for x in items]:
+		raise AssertionError('Columns of an array of unions differ from the unions')
+	
+	for rows in (1000, 1000000):
+		points = (library.point * rows)()
+		number = max(1, 100000 // rows)
+		walk = measure(lambda: sum(p.x for p in points), repeat=3, number=number)
+		view = measure(lambda: sum(dll.StructView(library.point, points).x), repeat=3, number=number)
+		report('structview', rows=rows, walk_seconds=walk, view_seconds=view, speedup=walk / view)
+
+@benchmark
+def dtype():
+	'''Reading a field of an array of structures, compared with a NumPy array over the same memory'''
+	try:
+		import numpy
+	except ImportError:
+		return
+	library = dll.Loader(compiled=False).load(build())
+	
+	# Layout of structures, unions, and structures with a union member
+	for name in ('point', 'number', 'tagged'):
+		type, dtype = library[name], library._dtype(name)
+		fields = [(field, getattr(type, field).offset) for field, _ in dll.Utils.fields(type)]
+		if dtype.itemsize != dll.ctypes.sizeof(type) or [(field, dtype.fields[field][1]) for field, _ in fields] != fields:
+			raise AssertionError('"{name}": Layout of the dtype differs from the ctypes type'.format(name=name))
+	
+	for rows in (1000, 1000000):
+		items = (library.tagged * rows)()
+		number = max(1, 100000 // rows)
+		walk = measure(lambda: sum(x.value.i for x in items), repeat=3, number=number)
+		array = measure(lambda: int(numpy.sum(library._ndarray(items)['value']['i'])), repeat=3, number=number)
+		report('dtype', rows=rows, walk_seconds=walk, ndarray_seconds=array, speedup=walk / array)
+
+def main(args=None):
+	global output
+	parser = argparse.ArgumentParser(description='Benchmarks for the dll module')
+	parser.add_argument('-o', '--output', help='Write results to this file instead of the standard output')
+	parser.add_argument('-s', '--size', type=int, action='append', help='Size of the synthetic descriptors (repeatable)')
+	parser.add_argument('names', nargs='*', help='Benchmarks to run: %s' % ', '.join(f.__name__ for f in benchmarks))
+	args = parser.parse_args(args)
+	
+	if args.size:
+		sizes[:] = args.size
+	if args.output:
+		output = open(args.output, 'w')
+	try:
+		report('environment', python=platform.python_version(), implementation=platform.python_implementation(), platform=platform.platform(), dll=dll.versionstring)
+		for f in benchmarks:
+			if not args.names or f.__name__ in args.names:
+				f()
+	finally:
+		if output is not sys.stdout:
+			output.close()
+
+if __name__ == '__main__':
+	main()
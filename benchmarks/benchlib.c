@@ -0,0 +1,59 @@
+/* Small C library used by the dll benchmarks */
+
+#include <stddef.h>
+#include <stdint.h>
+
+typedef struct point {
+	double x;
+	double y;
+} point;
+
+int32_t counter = 0;
+
+point points[4] = {{1, 2}, {3, 4}, {5, 6}, {7, 8}};
+
+void noop(void)
+{
+}
+
+int32_t add_i32(int32_t a, int32_t b)
+{
+	return a + b;
+}
+
+double scale_f64(double value, double factor)
+{
+	return value * factor;
+}
+
+uint32_t checksum(const uint8_t *data, size_t size)
+{
+	uint32_t result = 0;
+	for (size_t i = 0; i < size; ++i)
+		result = result * 31 + data[i];
+	return result;
+}
+
+void divmod_i32(int32_t a, int32_t b, int32_t *quotient, int32_t *remainder)
+{
+	*quotient = a / b;
+	*remainder = a % b;
+}
+
+double point_norm2(const point *p)
+{
+	return p->x * p->x + p->y * p->y;
+}
+
+double point_dot(point a, point b)
+{
+	return a.x * b.x + a.y * b.y;
+}
+
+int32_t for_each_block(uint8_t *data, size_t size, size_t block, int32_t (*callback)(uint8_t *, size_t))
+{
+	int32_t result = 0;
+	for (size_t i = 0; i < size; i += block)
+		result += callback(data + i, size - i < block ? size - i : block);
+	return result;
+}
@@ -3,6 +3,17 @@ import re
 import json
 import ctypes
 import weakref
+import threading
+import itertools
+import collections
+import hashlib
+import marshal
+import tempfile
+import time
+import array
+import mmap
+import atexit
+import keyword
 
 # Library version
 version = (1, 0, 0)
@@ -15,12 +26,15 @@ bytes = type(b'')
 # The type that python uses internally for names (This differs between 2 and 3)
 istr = type('')
 
+# Lazy map, the built in one is eager on python 2
+imap = getattr(itertools, 'imap', map)
+
 # ctypes.c_void_p is broken, use pointer instead
 class pointer(ctypes.c_void_p):
 	pass
 
 # Exports
-__all__ = ('Types', 'Library', 'Loader', 'load')
+__all__ = ('Types', 'Library', 'StructView', 'CallStats', 'AsyncCalls', 'Callbacks', 'BufferPool', 'TypePool', 'ProcessLibrary', 'WorkerError', 'Loader', 'LoadError', 'SymbolError', 'Generator', 'load', 'load_many', 'reload', 'generate')
 
 class Types(object):
 
@@ -37,6 +51,11 @@ class Types(object):
 		On its own this type system will construct types using the "ctypes" type system in python. But you can
 		override this behaviour, by replacing the "_pointer", "_array", and "_function" methods, and replacing the
 		built in types.
+		
+		Parsed type strings and built types are memoized. Parsing is cached by the type string, and building is cached
+		by the parsed type and the identity of the namespace used. Both caches are bounded by "cachesize" and evict the
+		least recently used entries first. Use "cache_info" to see how effective they are, and "cache_clear" to empty
+		them.
 	'''
 	
 	CALLTYPES = {
@@ -108,15 +127,30 @@ class Types(object):
 			'F64' : ctypes.c_double
 		}, 
 	}
+	
+	# Types of the type sets whose size depends on the platform, and the type they have the size of
+	PLATFORM = {
+		'size_t': 'c_size_t', 'IZ': 'c_size_t', 'UZ': 'c_size_t',
+		'ptrdiff_t': 'c_void_p', 'intptr_t': 'c_void_p', 'uintptr_t': 'c_void_p', 'IA': 'c_void_p', 'UA': 'c_void_p',
+	}
 
-	def __init__(self, typesets='simple'):
+	def __init__(self, typesets='simple', cachesize=4096):
 		# Init
 		self._list = {}
-		self._cache = {}
+		self._cache = collections.OrderedDict()
+		self._parsed = collections.OrderedDict()
+		# Types derived from the types of a library are only held weakly, so they do not keep private libraries alive
+		self._params = weakref.WeakValueDictionary()
+		self._gil = weakref.WeakValueDictionary()
+		self._dtypes = weakref.WeakKeyDictionary()
+		self._lock = threading.Lock()
+		self.cachesize = cachesize
+		self.cache_clear()
 		
 		# Load type systems
 		if not isinstance(typesets, tuple):
 			typesets = tuple(name.strip() for name in typesets.split(','))
+		self.typesets = typesets
 		for name in typesets:
 			self._list.update(self.TYPESETS[name])
 	
@@ -125,6 +159,69 @@ class Types(object):
 		
 	def __setitem__(self, name, value):
 		self._list[name] = value
+		# Built types may depend on the old value
+		with self._lock:
+			self._cache.clear()
+	
+	def cache_info(self):
+		'''Return the hit and miss counters, and the current size of the parse and build caches'''
+		return {
+			'parse_hits': self.parse_hits,
+			'parse_misses': self.parse_misses,
+			'parse_size': len(self._parsed),
+			'build_hits': self.build_hits,
+			'build_misses': self.build_misses,
+			'build_size': len(self._cache),
+			'cachesize': self.cachesize,
+		}
+	
+	def cache_clear(self):
+		'''Empty the parse and build caches, and reset their counters'''
+		with self._lock:
+			self._cache.clear()
+			self._parsed.clear()
+			self.parse_hits = self.parse_misses = 0
+			self.build_hits = self.build_misses = 0
+	
+	def cache_discard(self, namespace):
+		'''Remove the types built with a namespace from the build cache, after the namespace changed'''
+		with self._lock:
+			for key in [k for k, (ref, _) in self._cache.items() if ref is not None and ref() is namespace]:
+				del self._cache[key]
+	
+	def parse(self, text):
+		'''Parse a type string, reusing the result of earlier calls with the same string'''
+		# Caches are shared between threads, but parsing is done outside of the lock
+		with self._lock:
+			result = self._parsed.pop(text, None)
+			if result is not None:
+				self.parse_hits += 1
+				self._parsed[text] = result
+				return result
+		
+		result = self.parsetype(text)
+		with self._lock:
+			self.parse_misses += 1
+			if self.cachesize > 0:
+				if len(self._parsed) >= self.cachesize:
+					self._parsed.popitem(last=False)
+				self._parsed[text] = result
+		return result
+	
+	def compile(self, text, namespace=None):
+		'''Parse and build a type string, using an optional namespace object. Already parsed types are built as is.'''
+		if not isinstance(text, tuple):
+			text = self.parse(text)
+		return self.build(text, namespace=namespace)
+	
+	def alloc(self, type, count=None, align=None, namespace=None):
+		'''
+		Allocate an instance of a type, or an array of "count" elements of it, at an address that is a multiple of
+		"align" bytes. The type is a ctypes type, or a type string compiled with an optional namespace object.
+		'''
+		if isinstance(type, (str, istr, tuple)):
+			type = self.compile(type, namespace=namespace)
+		return Utils.aligned(type, count, align)
 		
 	def find(self, name, namespace=None):
 		'''Find a type by name, using an optional namespace object'''
@@ -137,6 +234,36 @@ class Types(object):
 	
 	def build(self, type, namespace=None):
 		'''Build a complex type from other types, using an optonal namespace object.'''
+		if self.cachesize <= 0:
+			return self._build(type, namespace)
+		
+		# Namespaces are only referenced weakly, so the cache does not keep private libraries alive
+		if namespace is None:
+			key, ref = (type, None), None
+		else:
+			try:
+				key, ref = (type, id(namespace)), weakref.ref(namespace)
+			except TypeError:
+				return self._build(type, namespace)
+		
+		# Look up in cache
+		with self._lock:
+			entry = self._cache.pop(key, None)
+			if entry is not None and (ref is None or entry[0]() is namespace):
+				self.build_hits += 1
+				self._cache[key] = entry
+				return entry[1]
+		
+		# Build and save
+		result = self._build(type, namespace)
+		with self._lock:
+			self.build_misses += 1
+			if len(self._cache) >= self.cachesize:
+				self._cache.popitem(last=False)
+			self._cache[key] = (ref, result)
+		return result
+	
+	def _build(self, type, namespace):
 		if type == '()':
 			return None
 		elif type == '...':
@@ -163,7 +290,7 @@ class Types(object):
 	
 	def build_array(self, type, length):
 		'''Create type value for array'''
-		return type * (length or 0)
+		return type * int(length or 0)
 	
 	def build_function(self, params, result, calltype):
 		'''Create type value for functions'''
@@ -181,6 +308,134 @@ class Types(object):
 				return ctypes.WINFUNCTYPE(result, *params)
 			else:
 				raise ValueError('calltype: Invalid value')
+	
+	def build_gil(self, functype, hold=False):
+		'''
+		Return a function type that holds the GIL during calls (like the functions of ctypes.pydll), or one that
+		releases it, with the same parameters and result.
+		'''
+		flags = functype._flags_ | ctypes._FUNCFLAG_PYTHONAPI if hold else functype._flags_ & ~ctypes._FUNCFLAG_PYTHONAPI
+		if flags == functype._flags_:
+			return functype
+		try:
+			return self._gil[functype, flags]
+		except KeyError:
+			pass
+		
+		result = type(functype.__name__, (ctypes._CFuncPtr,), {'_argtypes_': functype._argtypes_, '_restype_': functype._restype_, '_flags_': flags})
+		if functype.__dict__.get('argtypes', True) is None:
+			# Vararg function
+			result.argtypes = None
+		self._gil[functype, flags] = result
+		return result
+	
+	def build_dtype(self, type):
+		'''
+		Create the NumPy dtype of a ctypes type, with the same memory layout. Structures and unions become structured
+		dtypes with the offsets, padding and size that ctypes computed, arrays become subarrays, and pointers become
+		unsigned integers. NumPy is optional, it is only imported here.
+		'''
+		try:
+			return self._dtypes[type]
+		except KeyError:
+			pass
+		
+		import numpy
+		if issubclass(type, (ctypes.Structure, ctypes.Union)):
+			if '_fields_' not in type.__dict__:
+				raise TypeError('"{name}": Incomplete types have no dtype'.format(name=type.__name__))
+			names, formats, offsets = [], [], []
+			for field in Utils.fields(type):
+				if len(field) > 2:
+					raise TypeError('"{name}.{field}": Bit fields have no dtype'.format(name=type.__name__, field=field[0]))
+				names.append(field[0])
+				formats.append(self.build_dtype(field[1]))
+				offsets.append(getattr(type, field[0]).offset)
+			result = numpy.dtype({'names': names, 'formats': formats, 'offsets': offsets, 'itemsize': ctypes.sizeof(type)})
+		elif issubclass(type, ctypes.Array):
+			result = numpy.dtype((self.build_dtype(type._type_), (type._length_,)))
+		elif issubclass(type, (ctypes._Pointer, ctypes._CFuncPtr, ctypes.c_void_p, ctypes.c_char_p, ctypes.c_wchar_p)):
+			result = numpy.dtype(numpy.uintp)
+		elif issubclass(type, ctypes.c_char):
+			result = numpy.dtype('S1')
+		elif issubclass(type, ctypes.c_wchar):
+			result = numpy.dtype('U1') if ctypes.sizeof(type) == 4 else numpy.dtype(numpy.uint16)
+		elif issubclass(type, ctypes._SimpleCData):
+			result = numpy.dtype(type)
+		else:
+			raise TypeError('"{name}": Type has no dtype'.format(name=type.__name__))
+		
+		self._dtypes[type] = result
+		return result
+	
+	def build_param(self, argtype, readonly=False):
+		'''
+		Create the parameter type used by exported functions for a type. Pointer and array parameters also accept
+		objects with the buffer protocol, and pass a pointer to their memory without copying. Read-only buffers are
+		only accepted if "readonly" is set. They also accept leases of buffer pools. Other types are returned as is.
+		'''
+		if not isinstance(argtype, type):
+			return argtype
+		if issubclass(argtype, ctypes.Array):
+			# Arrays are passed as pointers to their first element
+			base, element, length = ctypes.POINTER(argtype._type_), argtype._type_, argtype._length_
+		elif issubclass(argtype, ctypes._Pointer):
+			base, element, length = argtype, argtype._type_, 0
+		elif issubclass(argtype, ctypes.c_void_p):
+			base, element, length = argtype, None, 0
+		else:
+			return argtype
+		
+		key = (argtype, readonly)
+		try:
+			return self._params[key]
+		except KeyError:
+			pass
+		# Pointers and arrays of the element type are passed as they are, instances of it by reference, and other
+		# values are converted by ctypes first, unless they are common buffer types. Looked up once for each type.
+		conversions, byref = {}, ctypes.byref
+		def conversion(kind):
+			if issubclass(kind, (base, ctypes.Array) if element is not None else (ctypes._Pointer, ctypes.Array, ctypes.c_void_p)):
+				if element is None or kind._type_ is element:
+					return True
+			elif element is not None and issubclass(kind, element):
+				return byref
+			if issubclass(kind, Utils.BUFFERS + (BufferPool.Lease,)):
+				return None
+			return base.from_param
+		
+		def from_param(cls, value):
+			convert = conversions.get(type(value), False)
+			if convert is True:
+				return value
+			elif convert is byref:
+				return byref(value)
+			elif convert is False:
+				conversions[type(value)] = conversion(type(value))
+				return from_param(cls, value)
+			error = None
+			if convert is not None:
+				try:
+					return convert(value)
+				except TypeError as ex:
+					error = ex
+			
+			# Leases take a buffer from their pool, for the element type of the parameter
+			if isinstance(value, BufferPool.Lease):
+				if element is None and value.count is None:
+					raise TypeError('The count is required for void pointers')
+				return value.take(element or ctypes.c_char, length or None)
+			try:
+				view = memoryview(value)
+			except TypeError:
+				if error is not None:
+					raise error
+				# Arrays and mmaps only have the old buffer interface on python 2, they are viewed as ctypes arrays
+				view = memoryview((Utils.TYPECODES[getattr(value, 'typecode', 'c')] * len(value)).from_buffer(value))
+			return Utils.bufferpointer(base, view, element, length, readonly)
+		
+		param = self._params[key] = type(istr(base.__name__), (base,), {'from_param': classmethod(from_param)})
+		return param
 			
 	@staticmethod
 	def isident(text):
@@ -194,15 +449,29 @@ class Types(object):
 	def isinteger(text):
 		return text and text.isdigit()
 		
+	# Symbols are matched before words, and words stop at the first symbol or whitespace
+	TOKEN_PATTERN = re.compile(r'\s*(?:(->|\.\.\.|[,*\[\]()])|((?:(?!->|\.\.\.)[^\s,*\[\]()])+))')
+	
+	@classmethod
+	def scan(cls, text):
+		'''Split a type string into a list of (token, position) pairs in a single pass'''
+		result = []
+		match = cls.TOKEN_PATTERN.match
+		pos, end = 0, len(text)
+		while pos < end:
+			m = match(text, pos)
+			if m is None or m.end() == pos:
+				# Only trailing whitespace is left
+				if text[pos:].isspace():
+					break
+				raise ValueError('Syntax error: Invalid character at %d: %s' % (pos, text[pos]))
+			result.append((m.group(m.lastindex), m.start(m.lastindex)))
+			pos = m.end()
+		return result
+	
 	@classmethod
 	def tokenize(cls, text):
-		# List of symbols
-		symbols = {'->', ',', '*', '...', '[', ']', '(', ')'}
-		
-		# Tokenize input the fast way
-		for s in symbols:
-			text = text.replace(s, ' %s ' % s)
-		return text.split()
+		return [token for token, _ in cls.scan(text)]
 		
 	@classmethod
 	def parsetype(cls, text):
@@ -222,186 +491,187 @@ class Types(object):
 		#	
 		#	CallingConvention ::= '@' + IDENTIFIER
 		#	ResultType ::= '(' ')' | Type
+		#
+		#	The grammar is parsed predictively, with one token of lookahead. The only ambiguous prefix is '(', which
+		#	can start a parameter list or a grouped expression. Both are parsed as a list, and the tokens after the
+		#	closing ')' decide which one it was. Every token is consumed exactly once.
 		
-		def parse_type(pos):
-			return parse_type_2(pos) or parse_type_1(pos) or parse_expr(pos)
-		
-		def parse_type_1(pos):
-			# Type --> ExpressionList [ CallingConvention ] '->' ResultType
-			try:
-				l, pos = parse_expr_list(pos)
-				c = parse_call_conv(pos)
-				if c:
-					c, pos = c
-				_, pos = parse_tokens(pos, ['->'])
-				r, pos = parse_result(pos)
-				return ('->', tuple(l), r, c), pos
-			except TypeError:
-				return None
-			
-		def parse_type_2(pos):
+		def parse_type(pos, result=False):
+			# Type --> ExpressionList [ CallingConvention ] '->' ResultType | Expression
 			# Type --> '(' [ ExpressionList ] ')' [ CallingConvention ] '->' ResultType
-			try:
-				_, pos = parse_tokens(pos, ['('])
-				l = parse_expr_list(pos)
-				if l:
-					l, pos = l
-				_, pos = parse_tokens(pos, [')'])
-				c = parse_call_conv(pos)
-				if c:
-					c, pos = c
-				_, pos = parse_tokens(pos, ['->'])
-				r, pos = parse_result(pos)
-				l = l or ()
-				return ('->', tuple(l), r, c), pos
-			except TypeError:
-				return None
-			
+			l, pos = parse_list(pos, result)
+			if l is None:
+				# Only a result type can be '()'
+				return '()', pos
+			if peek(pos) in cls.CALLTYPES or peek(pos) == '->':
+				return parse_function(pos, l)
+			if len(l) == 1 and l[0] != '...':
+				return l[0], pos
+			return fail(pos, "'->'")
+		
+		def parse_function(pos, l):
+			# [ CallingConvention ] '->' ResultType
+			c = cls.CALLTYPES.get(peek(pos))
+			if c:
+				pos += 1
+			pos = expect(pos, '->')
+			r, pos = parse_type(pos, result=True)
+			return ('->', tuple(l), r, c), pos
+		
+		def parse_list(pos, result=False):
+			# ExpressionList --> Expression [ ',' Expression ] ... [ '...' ]
+			# ExpressionList --> '(' [ ExpressionList ] ')'
+			if peek(pos) == '(':
+				l, pos = parse_group(pos)
+				if len(l) != 1 or l[0] == '...':
+					# Parameter list, must be followed by a function
+					if peek(pos) in cls.CALLTYPES or peek(pos) == '->':
+						return l, pos
+					if result and not l:
+						return None, pos
+					return fail(pos, "'->'")
+				e, pos = parse_suffix(pos, l[0])
+			else:
+				e, pos = parse_expr(pos)
+			l = [e]
+			while peek(pos) == ',':
+				e, pos = parse_expr(pos + 1)
+				l.append(e)
+			if peek(pos) == '...':
+				l.append('...')
+				pos += 1
+			return l, pos
+		
+		def parse_group(pos):
+			# '(' [ ExpressionList | Type ] ')'
+			pos = expect(pos, '(')
+			if peek(pos) == ')':
+				return [], pos + 1
+			l, pos = parse_list(pos)
+			if peek(pos) in cls.CALLTYPES or peek(pos) == '->':
+				f, pos = parse_function(pos, l)
+				l = [f]
+			pos = expect(pos, ')')
+			return l, pos
+		
 		def parse_expr(pos):
-			return parse_expr_2(pos) or parse_expr_1(pos)
-			
-		def parse_expr_1(pos):
 			# Expression --> IDENTIFIER [ '[' [ NUMBER ] ']' | '*' ] ...
-			try:
-				i, pos = parse_ident(pos)
-			except TypeError:
-				return None
-			t = ('id', i)
-			x = parse_tokens(pos, ['*'], ('*', t)) or parse_expr_a(pos, t)
-			while x:
-				t, pos = x
-				x = parse_tokens(pos, ['*'], ('*', t)) or parse_expr_a(pos, t)
-			return t, pos
-
-		def parse_expr_2(pos):
 			# Expression --> '(' Type ')' [ '[' [ NUMBER ] ']' | '*' ] ...
-			try:
-				_, pos = parse_tokens(pos, ['('])
-				t, pos = parse_type(pos)
-				_, pos = parse_tokens(pos, [')'])
-			except TypeError:
-				return None
-			x = parse_tokens(pos, ['*'], ('*', t)) or parse_expr_a(pos, t)
-			while x:
-				t, pos = x
-				x = parse_tokens(pos, ['*'], ('*', t)) or parse_expr_a(pos, t)
-			return t, pos
-		
-		def parse_expr_a(pos, t):
-			# ??? --> [ '[' [ NUMBER ] ']'
-			try:
-				_, pos = parse_tokens(pos, ['['])
-				n = parse_int(pos)
-				if n:
-					n, pos = n
-				_, pos = parse_tokens(pos, [']'])
-				return ('[]', t, n), pos
-			except TypeError:
-				return None
-				
-		def parse_expr_list(pos):
-			# ExpressionList --> Expression [ ',' Expression ] ... [ '...' ]
-			try:
-				e, pos = parse_expr(pos)
-			except TypeError:
-				return None
-			r = [e]
-			try:
-				c = parse_tokens(pos, [','])
-				while c:
-					c, pos = c
-					e, pos = parse_expr(pos)
-					r.append(e)
-					c = parse_tokens(pos, [','])
-				c = parse_tokens(pos, ['...'])
-				if c:
-					c, pos = c
-					r.append('...')
-				return r, pos
-			except TypeError:
-				return None
-			
-		def parse_call_conv(pos):
-			# CallingConvention --> '@' + IDENTIFIER
-			try:
-				c, pos = parse_any(pos)
-				return cls.CALLTYPES[c], pos
-			except (TypeError, KeyError):
-				return None
-			
-		def parse_result(pos):
-			# ResultType --> '(' ')' | Type
-			return parse_type(pos) or parse_tokens(pos, ['(', ')'], '()')
+			if peek(pos) == '(':
+				l, pos = parse_group(pos)
+				if len(l) != 1 or l[0] == '...':
+					return fail(pos, "'->'")
+				return parse_suffix(pos, l[0])
+			i = peek(pos)
+			if not cls.isident(i):
+				return fail(pos, 'type')
+			return parse_suffix(pos + 1, ('id', i))
 		
-		def parse_any(pos):
-			if pos >= expr_len:
-				return None
-			return expr[pos], pos + 1
+		def parse_suffix(pos, t):
+			# [ '[' [ NUMBER ] ']' | '*' ] ...
+			while True:
+				s = peek(pos)
+				if s == '*':
+					t, pos = ('*', t), pos + 1
+				elif s == '[':
+					n = peek(pos + 1)
+					if cls.isinteger(n):
+						pos += 1
+					else:
+						n = None
+					pos = expect(pos + 1, ']')
+					t = ('[]', t, n)
+				else:
+					return t, pos
 		
-		def parse_int(pos):
-			if pos >= expr_len:
-				return None
-			r = expr[pos]
-			if cls.isinteger(r):
-				return r, pos + 1
-			return None
-			
-		def parse_ident(pos):
-			if pos >= expr_len:
-				return None
-			r = expr[pos]
-			if cls.isident(r):
-				return r, pos + 1
+		def peek(pos):
+			if pos < expr_len:
+				return expr[pos]
 			return None
 		
-		def parse_tokens(pos, l, r=None):
-			if pos >= expr_len:
-				return None
-			n = pos + len(l)
-			if expr[pos:n] == l:
-				return r, n
-			return None
+		def expect(pos, token):
+			if peek(pos) != token:
+				fail(pos, repr(token))
+			return pos + 1
+		
+		def fail(pos, expected):
+			if pos < expr_len:
+				raise ValueError('Syntax error: Unexpected input at %d: %s (expected %s)' % (where[pos], expr[pos], expected))
+			raise ValueError('Syntax error: Unexpected end of input at %d (expected %s)' % (len(text), expected))
 		
 		# Tokenize the input (and remove labels)
-		expr = [token for token in cls.tokenize(text) if not cls.islabel(token)]
+		tokens = [(token, pos) for token, pos in cls.scan(text) if not cls.islabel(token)]
+		expr = [token for token, _ in tokens]
+		where = [pos for _, pos in tokens]
 		expr_len = len(expr)
-		expr_err = None
 		
 		# Parse the type
-		result = parse_type(0)
-		if result:
-			result, end = result
-			if end != expr_len:
-				raise ValueError('Syntax error: Unexpected input: %s' % expr[end])
-			return result
-		else:
-			raise ValueError('Syntax error: Invalid expression!')
+		result, end = parse_type(0)
+		if result == '()':
+			return fail(0, 'type')
+		if end != expr_len:
+			return fail(end, 'end of input')
+		return result
 
 class Library(object):
+
+	'''
+		Library class - A loaded dynamic library
+		
+		Definitions and exports of the library are its attributes. Names starting with an underscore are escaped with
+		"_u", and can also be accessed by indexing. Members of the library object itself start with an underscore, so
+		they never hide a definition or an export.
+		
+		Exported functions can also be called from asyncio through "_aio", which runs them on worker threads. See
+		AsyncCalls. The trampolines of the callables passed to exported functions are kept in "_callbacks". See
+		Callbacks. Reusable buffers are taken from "_pool", the buffer pool of the loader. See BufferPool.
+		
+		Delayed definitions and exports can be resolved from several threads at once. Each export is resolved once,
+		under its own lock. Definitions refer to each other, so they are resolved under "_lock", and only become
+		attributes once they are complete. Resolved names are plain attributes, so later accesses take no lock.
+		
+		When the loader records a usage profile, the exports resolved are listed in "_profile" with the time since
+		loading. The "_warmup" event is set once the exports of a saved profile are resolved in the background. See
+		Loader.warmup.
+	'''
 	
 	def __init__(self, loader, binary):
 		self._loader = loader
 		self._binary = binary
 		self._delayed = {}
+		self._lock = threading.RLock()
+		self._guards = {}
+		self._owners = {}
+		self._staged = self._stager = None
+		self._loaded = Utils.clock()
+		self._profile = None
+		self._warmup = threading.Event()
+		self._included = set()
 		
 	def __getattr__(self, name):
+		attrname = name
+		
 		# Do not resolve reserved names
 		if not name.startswith('_') or name.startswith('_u_'):
 			# Unescape attribute name
-			attrname = name
 			if attrname.startswith('_u_'):
 				name = attrname[2:]
-				
-			try:
-				# Resolve delayed export
-				result = self._loader.load_delayed(self, self._delayed[name])
-				
-				# Move to attributes
-				del self._delayed[name]
-				self.__dict__[attrname] = result
-				return result
-			except KeyError:
+			
+			# Resolve delayed definition or export
+			if name in self._delayed:
+				return self._resolve(name, attrname)
+			
+			# Wait for the definitions resolved by other threads
+			with self._lock:
 				pass
+		
+		# Async calls and callbacks are created on first use
+		elif name == '_aio':
+			return self.__dict__.setdefault('_aio', AsyncCalls(self, workers=self._loader.aio_workers))
+		elif name == '_callbacks':
+			return self.__dict__.setdefault('_callbacks', Callbacks())
+		elif name == '_pool':
+			return self._loader.pool
 				
 		# Raise AttributeError
 		return object.__getattribute__(self, attrname)
@@ -416,180 +686,2062 @@ class Library(object):
 		except KeyError:
 			pass
 		
-		# Resolve delayed export
-		result = self._loader.load_delayed(self, self._delayed[name])
+		# Definitions being resolved by this thread
+		staged = self._staged
+		if staged is not None and attrname in staged and self._stager is threading.current_thread():
+			return staged[attrname]
+		
+		# Resolve delayed definition or export
+		return self._resolve(name, attrname)
+	
+	def _resolve(self, name, attrname):
+		current = threading.current_thread()
+		with self._lock:
+			# Resolved by another thread in the meantime
+			if attrname in self.__dict__:
+				return self.__dict__[attrname]
+			delayed = self._delayed[name]
+			# Definitions referring to themselves do not resolve again
+			if self._owners.get(name) is current:
+				raise KeyError(name)
+			if delayed[0] not in ('F', 'V'):
+				return self._define(name, attrname, delayed, current)
+			
+			# Exports are resolved under their own lock
+			guard = self._guards.get(name)
+			if guard is None:
+				guard = self._guards[name] = threading.Lock()
+		
+		with guard:
+			if attrname in self.__dict__:
+				return self.__dict__[attrname]
+			self._owners[name] = current
+			try:
+				result = self._loader.load_delayed(self, delayed)
+			finally:
+				del self._owners[name]
+			
+			# Move to attributes, unless the library was reloaded in the meantime
+			with self._lock:
+				if self._delayed.get(name) is delayed:
+					self.__dict__[attrname] = result
+					self._delayed.pop(name, None)
+					self._guards.pop(name, None)
+			if self._profile is not None:
+				self._profile.append((name, Utils.clock() - self._loaded))
+			return result
+	
+	def _define(self, name, attrname, delayed, current):
+		'''
+		Resolve a delayed definition, with the lock of the library held. The definitions it resolves are staged, and
+		only become attributes when the first one is complete, so other threads never see a structure without fields.
+		'''
+		outer = self._staged is None
+		if outer:
+			self._staged, self._stager = {}, current
+		self._owners[name] = current
+		try:
+			result = self._staged[attrname] = self._loader.load_delayed(self, delayed)
+		except BaseException:
+			if outer:
+				self._staged = self._stager = None
+			raise
+		finally:
+			del self._owners[name]
+		self._delayed.pop(name, None)
 		
 		# Move to attributes
-		del self._delayed[name]
-		self.__dict__[attrname] = result
+		if outer:
+			staged, self._staged, self._stager = self._staged, None, None
+			self.__dict__.update(staged)
 		return result
-		
+	
 	def __setitem__(self, name, value):
 		# Escape names starting with underscore
 		if name.startswith('_'):
 			name = '_u' + name
 	
-		# Set value in object
-		self.__dict__[name] = value
-
-class Loader(object):
-	# File format version of the library descriptor JSON
-	FORMAT_VERSION = 2
+		# Set value in object, or stage it with the definition being resolved
+		staged = self._staged
+		if staged is not None and self._stager is threading.current_thread():
+			staged[name] = value
+		else:
+			self.__dict__[name] = value
+	
+	def _batch(self, name, *columns, **kwargs):
+		'''Call an exported function for each row of the columns. See Loader.batch'''
+		return self._loader.batch(self, name, columns, **kwargs)
+	
+	def _dtype(self, type):
+		'''Return the NumPy dtype of a type, or of a type of the library by name. See Loader.dtype'''
+		return self._loader.dtype(self, type)
+	
+	def _ndarray(self, source, count=None, element=None):
+		'''Wrap the memory of a ctypes object as a NumPy array. See Loader.ndarray'''
+		return self._loader.ndarray(self, source, count=count, element=element)
+	
+	def _alloc(self, type, count=None, align=None):
+		'''Allocate an instance or an array of a type of the library, with an alignment. See Loader.alloc'''
+		return self._loader.alloc(self, type, count=count, align=align)
 
-	# Path for loading dlls
-	path = ['.'] + list(sys.path)
-	# Extensions of the library binary
-	extensions = ['dlib'] + {'nt': ['dll'], 'posix': ['so']}.get(os.name, [])
-	# Binary cache to avoid loading a library multiple times
-	binary_cache = weakref.WeakValueDictionary()
+class StructView(object):
 
-	def __init__(self, path=None, extensions=None, types=None):
-		# Public dlls are cached by the loader. Loaders do not share caches
-		self.cache = {}
+	'''
+		StructView class - Columns over an array of structures
 		
-		# Set path and extensions
-		if path is not None:
-			self.path = path
-		if extensions is not None:
-			self.extensions = extensions
+		A view over an array of structures or unions in memory, that exposes each field as a column. Columns of simple
+		types and pointers are strided memoryviews over the same memory, columns of nested structures are views
+		themselves, and columns of arrays are tuples of columns, one for each element. Nothing is copied.
 		
-		# Create type system with default type sets
-		self.types = types or Types(typesets='simple')
+		The source can be a ctypes array (for example an exported variable), a pointer with a count, or any object
+		with the buffer protocol. Indexing returns a structure object that shares memory with the view, and slicing
+		returns another view.
+		
+		Fields are accessed as attributes, or by indexing with their name. Members of the view itself start with an
+		underscore, so they never hide a field.
+		
+		Columns are memoryviews cast to the format of the field, so views need python 3.
+	'''
 	
-	def load(self, filename, binary=None, delayed=False, private=False):
-		# Normalize filename
-		filename = os.path.abspath(filename)
+	# Memoryview formats for the simple ctypes type codes. Pointers are columns of addresses.
+	FORMATS = {
+		'b': 'b', 'B': 'B', 'h': 'h', 'H': 'H', 'i': 'i', 'I': 'I', 'l': 'l', 'L': 'L', 'q': 'q', 'Q': 'Q',
+		'f': 'f', 'd': 'd', 'c': 'c', '?': '?', 'P': 'P', 'z': 'P', 'Z': 'P',
+	}
 	
-		# Load from cache
-		if not private:
-			library = self.cache.get(filename)
-			if library is not None:
-				return library
-				
-		# Load library descriptor json with comments removed
-		with io.open(filename, 'r', encoding='utf-8') as file:
-			config = json.loads(re.sub(r'^[ \t]*#.*$', '', file.read(), flags=re.MULTILINE))
-			
-		# Validate file format
-		if config['type'] != 'library':
-			raise ValueError('"{filename}": Value of "type" need to be "{expected}"!'.format(filename=filename, expected="library"))
-		if int(config['version']) != self.FORMAT_VERSION:
-			raise ValueError('"{filename}": Value of "version" need to be "{expected}"!'.format(filename=filename, expected=self.FORMAT_VERSION))
-		
-		# Locate binary
-		defpath = os.path.dirname(filename)
-		defname = os.path.splitext(os.path.basename(filename))[0]
-		if binary is None:
-			binary = config.get('binary', '*.*')
-		binary = binary.replace('*', defname, 1)
-		binary = self.locate(binary, path = [defpath] + self.path, extensions=self.extensions)
-		if binary is None:
-			raise ValueError('"{filename}": Not found!'.format(filename=filename))
+	def __init__(self, struct, source, count=None):
+		if not hasattr(memoryview, 'cast'):
+			raise NotImplementedError('StructView needs memoryview.cast, which python 2 does not have')
+		self._struct = struct
+		size = ctypes.sizeof(struct)
 		
-		try:
-			binary = self.binary_cache[binary]
-		except KeyError:
-			binary = self.binary_cache[binary] = ctypes.cdll.LoadLibrary(binary)
+		# Pointers need a count to know the extent of the memory
+		if isinstance(source, ctypes._Pointer):
+			if count is None:
+				raise ValueError('The count is required for pointers')
+			source = ctypes.cast(source, ctypes.POINTER(struct * count)).contents if count else (struct * 0)()
 		
-		# Create library
-		config = config['library']
-		library = Library(loader=self, binary=binary)
-		library.version = config['version']
-		library._version = library.version
-		library.description = config['description']
-		library._description = library.description
-		self.load_defines(library, config['define'])
-		self.load_exports(library, config['export'], delayed=delayed)
+		# Map memory as bytes
+		self._source = source
+		self._memory = memoryview(source).cast('B') if size else memoryview(b'')
+		if count is None:
+			count = len(self._memory) // size if size else 0
+		elif count * size > len(self._memory):
+			raise ValueError('Buffer size {nbytes} is less than {type}[{count}]'.format(nbytes=len(self._memory), type=struct.__name__, count=count))
 		
-		# Save and return library
-		if not private:
-			self.cache[filename] = library
-		return library
+		# Offset of the structure within an element, size of an element, and the selected elements
+		self._offset = 0
+		self._stride = size
+		self._range = range(count)
+		self._columns = {}
 	
-	def locate(self, filename, path=None, extensions=None):
-		'''
-		Locate the binary based on its name.
-		
-		When locating a binary for library, the directory of the library descriptor file is searched before any other
-		locations in the path. To simulate this, you must manually add this directory to the path when invoking this
-		function, otherwise binaries next to the descriptor file may not be found.
-		'''
+	@classmethod
+	def _nested(cls, parent, struct, offset):
+		'''Create a view of a nested structure field'''
+		self = cls.__new__(cls)
+		self._struct = struct
+		self._source = parent._source
+		self._memory = parent._memory
+		self._offset = offset
+		self._stride = parent._stride
+		self._range = parent._range
+		self._columns = {}
+		return self
 	
-		# Set up path and extensions
-		if path is None:
-			path = self.path
-		if extensions is None:
-			extensions = self.extensions
+	def __len__(self):
+		return len(self._range)
+	
+	def __iter__(self):
+		for index in self._range:
+			yield self._struct.from_buffer(self._memory, index * self._stride + self._offset)
+	
+	def __getitem__(self, index):
+		# Columns by name
+		if isinstance(index, (str, istr)):
+			return self._column(index)
 		
-		# Check directory and extension. Both are optional.
-		hasdir = bool(os.path.dirname(filename))
-		hasext = bool(os.path.splitext(filename)[1])
+		# Slices share memory
+		if isinstance(index, slice):
+			result = self._nested(self, self._struct, self._offset)
+			result._range = self._range[index]
+			return result
 		
-		# Special suffix for files with '.' in the name to indicate the lack of an extension
-		if filename.endswith('.*'):
-			hasext = False
-			filename = filename[:-2]
+		# Elements share memory
+		return self._struct.from_buffer(self._memory, self._range[index] * self._stride + self._offset)
+	
+	def __getattr__(self, name):
+		if name.startswith('_'):
+			return object.__getattribute__(self, name)
+		try:
+			return self._column(name)
+		except KeyError:
+			raise AttributeError(name)
+	
+	def _fields(self):
+		'''Return the names of the fields'''
+		return [field[0] for field in Utils.fields(self._struct)]
+	
+	def _column(self, name):
+		'''Return the column of a field'''
+		try:
+			return self._columns[name]
+		except KeyError:
+			pass
 		
-		if hasdir:
-			# Look up in directory
-			if hasext:
-				file = os.path.abspath(filename)
-				if os.path.isfile(file):
-					return file
-			else:
-				for e in extensions:
-					file = os.path.abspath(filename) + '.' + e
-					if os.path.isfile(file):
-						return file
+		# Find field
+		for field in Utils.fields(self._struct):
+			if field[0] == name:
+				break
 		else:
-			# Look up in path
-			for root in path:
-				root = os.path.abspath(root)
-				if hasext:
-					file = os.path.join(root, filename)
-					if os.path.isfile(file):
-						return file
-				else:
-					for e in extensions:
-						file = os.path.join(root, filename) + '.' + e
-						if os.path.isfile(file):
-							return file
+			raise KeyError(name)
+		if len(field) > 2:
+			raise TypeError('"{name}": Bit fields can not be viewed as columns'.format(name=name))
 		
-		# Look up failed
-		return None
+		result = self._columns[name] = self._build(name, field[1], self._offset + getattr(self._struct, name).offset)
+		return result
+	
+	def _build(self, name, type, offset):
+		'''Build the column of a field with a type at an offset'''
+		# Nested structures and arrays
+		if issubclass(type, (ctypes.Structure, ctypes.Union)):
+			return self._nested(self, type, offset)
+		if issubclass(type, ctypes.Array):
+			size = ctypes.sizeof(type._type_)
+			return tuple(self._build(name, type._type_, offset + index * size) for index in range(type._length_))
 		
-	def load_defines(self, library, defines):
-		# Define constants
-		for id, kind, value in defines.get('const', []):
-			self.check_unique(library, id)
-			self.define_const(library, id, kind, value)
+		# Simple types and pointers
+		code = getattr(type, '_type_', None)
+		if issubclass(type, (ctypes._Pointer, ctypes._CFuncPtr)):
+			code = 'P'
+		format = self.FORMATS.get(code) if isinstance(code, istr) else None
+		if format is None:
+			raise TypeError('"{name}": Type {type} can not be viewed as a column'.format(name=name, type=type.__name__))
+		size = ctypes.sizeof(type)
+		if offset % size or self._stride % size:
+			raise TypeError('"{name}": Field is not aligned to its size'.format(name=name))
+		column = self._memory.cast(format)[offset // size::self._stride // size]
 		
-		# Define types - First pass
-		for id, kind, value in defines.get('type', []):
-			self.check_unique(library, id)
-			if kind in ('struct', 'union'):
-				self.declare_type(library, id, kind)
-			else:
-				self.define_type(library, id, kind, value)
+		# Select the elements of the view
+		elements = self._range
+		if not elements:
+			return column[:0]
+		stop = elements.start + len(elements) * elements.step
+		return column[elements.start:stop if stop >= 0 else None:elements.step]
+
+class CallStats(object):
+
+	'''
+		CallStats class - Call statistics of exported functions
+		
+		Statistics are collected separately by each thread, without locking, and merged when they are read. For each
+		function it counts the calls, and the total and maximum time spent in them, and the time spent converting the
+		arguments. Times are in seconds.
+	'''
+	
+	def __init__(self):
+		self._local = threading.local()
+		self._lock = threading.Lock()
+		self._tables = []
+	
+	def _table(self):
+		'''Return the statistics table of the current thread'''
+		try:
+			return self._local.table
+		except AttributeError:
+			table = self._local.table = {}
+			with self._lock:
+				self._tables.append(table)
+			return table
+	
+	def record(self, key, elapsed, convert, callsite=None):
+		'''Record a call of the function identified by "key"'''
+		table = self._table()
+		for key in (key, (key, callsite)) if callsite else (key,):
+			entry = table.get(key)
+			if entry is None:
+				entry = table[key] = [0, 0.0, 0.0, 0.0]
+			entry[0] += 1
+			entry[1] += elapsed
+			entry[2] = max(entry[2], elapsed)
+			entry[3] += convert
+	
+	def reset(self):
+		'''Clear the statistics of all threads'''
+		with self._lock:
+			for table in self._tables:
+				table.clear()
+	
+	def snapshot(self):
+		'''Return the merged statistics of all threads, as a list of dictionaries sorted by total time. Call sites follow their function.'''
+		merged = {}
+		with self._lock:
+			tables = list(self._tables)
+		for table in tables:
+			for key, (count, total, peak, convert) in list(table.items()):
+				entry = merged.get(key)
+				if entry is None:
+					merged[key] = [count, total, peak, convert]
+				else:
+					entry[0] += count
+					entry[1] += total
+					entry[2] = max(entry[2], peak)
+					entry[3] += convert
+		
+		result = []
+		for key, (count, total, peak, convert) in merged.items():
+			callsite = None
+			if isinstance(key[0], tuple):
+				key, callsite = key
+			result.append({
+				'library': key[0],
+				'function': key[1],
+				'callsite': callsite and '%s:%d' % callsite,
+				'calls': count,
+				'total': total,
+				'max': peak,
+				'convert': convert,
+			})
+		
+		# Sort functions by total time, each followed by its call sites
+		totals = dict(((x['library'], x['function']), x['total']) for x in result if x['callsite'] is None)
+		result.sort(key=lambda x: (-totals.get((x['library'], x['function']), 0.0), x['library'], x['function'], x['callsite'] is not None, -x['total'], x['callsite'] or ''))
+		return result
+	
+	def report(self, format='text'):
+		'''Format the statistics as a plain text table or JSON, sorted by total time'''
+		stats = self.snapshot()
+		if format == 'json':
+			return json.dumps(stats, indent=1, sort_keys=True)
+		elif format != 'text':
+			raise ValueError('format: Invalid value')
+		
+		lines = ['%-40s %10s %12s %12s %12s %12s' % ('function', 'calls', 'total ms', 'mean us', 'max us', 'convert ms')]
+		for x in stats:
+			name = '%s.%s' % (x['library'], x['function'])
+			if x['callsite']:
+				name = '  ' + x['callsite']
+			lines.append('%-40s %10d %12.3f %12.3f %12.3f %12.3f' % (name, x['calls'], x['total'] * 1e3, x['total'] * 1e6 / x['calls'], x['max'] * 1e6, x['convert'] * 1e3))
+		return '\n'.join(lines)
+
+class AsyncCalls(object):
+
+	'''
+		AsyncCalls class - Exported functions for asyncio
+		
+		Runs exported functions on a pool of worker threads, and returns asyncio futures for their results, so that
+		blocking functions do not stall the event loop. ctypes releases the GIL during foreign calls, so the calls run
+		in parallel with the loop. At most "workers" calls run at once, the rest wait in a queue.
+		
+		A call that has not started yet is cancelled right away. A call that is already running can not be stopped, so
+		its future is only cancelled when the call returns. That way the buffers passed to it are never released or
+		reused while the function may still use them.
+		
+		Functions are accessed as attributes. Members of the object itself start with an underscore, so they never hide
+		a function.
+	'''
+	
+	def __init__(self, library, workers=4):
+		self._library = library
+		self._workers = workers
+		self._executor = None
+		self._functions = {}
+		self._lock = threading.Lock()
+		self._queued = self._running = self._calls = self._cancelled = self._peak = 0
+		self._wait = self._maxwait = 0.0
+	
+	def __getattr__(self, name):
+		# Do not resolve reserved names
+		if name.startswith('_') and not name.startswith('_u_'):
+			return object.__getattribute__(self, name)
+		if name.startswith('_u_'):
+			name = name[2:]
+		
+		try:
+			return self._functions[name]
+		except KeyError:
+			pass
+		function = self._library[name]
+		if not callable(function):
+			raise TypeError('"{name}": Not a function!'.format(name=name))
+		
+		def call(*args):
+			return self._submit(function, args)
+		
+		call.__name__ = istr(name)
+		call.__wrapped__ = function
+		self._functions[name] = call
+		return call
+	
+	def _submit(self, function, args):
+		'''Queue a call on the executor, and return an asyncio future for its result'''
+		import asyncio
+		future = self._future_type(asyncio)(loop=asyncio.get_event_loop())
+		submitted = Utils.clock()
+		with self._lock:
+			if self._executor is None:
+				import concurrent.futures
+				self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self._workers)
+			self._queued += 1
+			self._peak = max(self._peak, self._queued)
+		
+		def run():
+			wait = Utils.clock() - submitted
+			with self._lock:
+				self._queued -= 1
+				self._running += 1
+				self._wait += wait
+				self._maxwait = max(self._maxwait, wait)
+			try:
+				return function(*args)
+			finally:
+				with self._lock:
+					self._running -= 1
+					self._calls += 1
+		
+		def done(work):
+			if work.cancelled():
+				with self._lock:
+					self._queued -= 1
+					self._cancelled += 1
+			try:
+				future.get_loop().call_soon_threadsafe(future._settle, work)
+			except RuntimeError:
+				# The loop was closed in the meantime
+				pass
+		
+		future._work = self._executor.submit(run)
+		future._work.add_done_callback(done)
+		return future
+	
+	@staticmethod
+	def _future_type(asyncio, cache=[]):
+		'''Return the future type of the calls, created on first use'''
+		if cache:
+			return cache[0]
+		
+		class CallFuture(asyncio.Future):
+			_work = None
+			_cancelling = False
+			
+			def cancel(self, *args, **kwargs):
+				if self.done():
+					return False
+				if self._work.cancel():
+					return asyncio.Future.cancel(self, *args, **kwargs)
+				# Already running, the task awaiting it is cancelled when the call returns
+				self._cancelling = True
+				return False
+			
+			def _settle(self, work):
+				if self.done():
+					return
+				if self._cancelling or work.cancelled():
+					asyncio.Future.cancel(self)
+				elif work.exception() is not None:
+					self.set_exception(work.exception())
+				else:
+					self.set_result(work.result())
+		
+		cache.append(CallFuture)
+		return CallFuture
+	
+	def _metrics(self):
+		'''
+		Return the metrics of the calls as a dictionary: the number of queued and running calls, the most calls queued
+		at once, the number of finished and cancelled calls, and the total and maximum time calls waited in the queue.
+		Times are in seconds.
+		'''
+		with self._lock:
+			return {
+				'workers': self._workers,
+				'queued': self._queued,
+				'running': self._running,
+				'max_queued': self._peak,
+				'calls': self._calls,
+				'cancelled': self._cancelled,
+				'wait': self._wait,
+				'max_wait': self._maxwait,
+			}
+	
+	def _close(self, wait=True):
+		'''Shut down the worker threads. Queued calls still run, unless they are cancelled.'''
+		with self._lock:
+			executor, self._executor = self._executor, None
+		if executor is not None:
+			executor.shutdown(wait=wait)
+
+class Callbacks(object):
+
+	'''
+		Callbacks class - Trampolines for python callables
+		
+		Creates the function pointers (trampolines) that C code calls, to call python functions. The trampolines made
+		with "get" are made once for each function type and callable, and kept alive until they are released with
+		"release" or "clear", so C code can hold on to them as long as it needs.
+		
+		Exported functions pass callables through the trampolines made with "get", if there is one. Otherwise they make
+		one that is only kept alive during the call, and reused while it is among the "recent" ones made this way. Bound
+		methods are new objects on each access, so they are identified by their object and function.
+		
+		Trampolines can pass buffer parameters as memoryviews, instead of ctypes pointers. The memoryviews are only
+		valid while the callback runs.
+	'''
+	
+	def __init__(self, recent=64):
+		self.recent = recent
+		self._lock = threading.Lock()
+		self._cache = {}
+		self._recent = collections.OrderedDict()
+		self._params = {}
+	
+	def __len__(self):
+		return len(self._cache) + len(self._recent)
+	
+	@staticmethod
+	def _key(functype, function):
+		'''Return the cache key of a callable for a function type'''
+		owner, method = getattr(function, '__self__', None), getattr(function, '__func__', None)
+		if owner is not None and method is not None:
+			return (functype, id(owner), id(method))
+		return (functype, id(function))
+	
+	def get(self, functype, function, buffers=None):
+		'''
+		Return the trampoline of a callable for a function type, creating it on first use.
+		
+		Set "buffers" to pass pointer parameters as memoryviews. It maps the index of each pointer parameter to the
+		index of the parameter that holds its number of elements, or it can be True to use every pointer parameter
+		followed by an integer parameter. It only applies when the trampoline is created.
+		'''
+		key = self._key(functype, function)
+		with self._lock:
+			entry = self._cache.get(key)
+		if entry is not None:
+			return entry[1]
+		
+		result = self.build(functype, function, buffers)
+		with self._lock:
+			# The entry keeps the callable alive too, so its id is not reused
+			entry = self._cache.setdefault(key, (function, result))
+		return entry[1]
+	
+	def _convert(self, functype, function):
+		'''Return the trampoline of a callable passed to an exported function'''
+		key = self._key(functype, function)
+		with self._lock:
+			entry = self._cache.get(key)
+			if entry is None:
+				entry = self._recent.pop(key, None)
+				if entry is not None:
+					self._recent[key] = entry
+		if entry is not None:
+			return entry[1]
+		
+		# The call keeps the trampoline alive, the recent ones are only kept to be reused
+		result = self.build(functype, function)
+		with self._lock:
+			self._recent[key] = (function, result)
+			while len(self._recent) > self.recent:
+				self._recent.popitem(last=False)
+		return result
+	
+	def release(self, function, functype=None):
+		'''Release the trampolines of a callable, for all function types or only one. Returns the number released.'''
+		count = 0
+		with self._lock:
+			for cache in (self._cache, self._recent):
+				keys = [key for key in cache if key == self._key(key[0], function) and functype in (None, key[0])]
+				for key in keys:
+					del cache[key]
+				count += len(keys)
+		return count
+	
+	def clear(self):
+		'''Release all trampolines'''
+		with self._lock:
+			self._cache.clear()
+			self._recent.clear()
+	
+	def build(self, functype, function, buffers=None):
+		'''Create a trampoline, without caching it'''
+		argtypes = list(functype._argtypes_)
+		if buffers is True:
+			buffers = dict((index, index + 1) for index, argtype in enumerate(argtypes[:-1]) if (
+				issubclass(argtype, (ctypes._Pointer, ctypes.c_void_p)) and (Utils.typekind(argtypes[index + 1]) or ' ')[0] in 'iu'))
+		if not buffers:
+			return functype(function)
+		
+		# Buffer parameters are passed as addresses, and turned into memoryviews
+		views = []
+		for index, length in sorted(buffers.items()):
+			element = getattr(argtypes[index], '_type_', None)
+			if not isinstance(element, type):
+				element = ctypes.c_ubyte
+			format = StructView.FORMATS.get(getattr(element, '_type_', None), 'B')
+			views.append((index, length, ctypes.sizeof(element), format))
+			argtypes[index] = ctypes.c_void_p
+		memoryat = Utils.memoryat
+		
+		if len(views) == 1 and views[0][:2] == (0, 1) and len(argtypes) == 2:
+			# Common case of a single buffer and its size
+			_, _, size, format = views[0]
+			def trampoline(address, length):
+				return function(memoryat(address, length * size, format), length)
+		else:
+			def trampoline(*args):
+				args = list(args)
+				for index, length, size, format in views:
+					args[index] = memoryat(args[index], args[length] * size, format)
+				return function(*args)
+		
+		thunktype = type(functype.__name__, (ctypes._CFuncPtr,), {'_argtypes_': tuple(argtypes), '_restype_': functype._restype_, '_flags_': functype._flags_})
+		# The cast keeps the trampoline alive, and has the type that parameters expect
+		return ctypes.cast(thunktype(trampoline), functype)
+	
+	def param(self, functype):
+		'''Return the parameter type of exported functions for a function type, that converts callables to trampolines'''
+		try:
+			return self._params[functype]
+		except KeyError:
+			pass
+		
+		def from_param(cls, value):
+			if callable(value) and not isinstance(value, ctypes._CFuncPtr):
+				value = self._convert(functype, value)
+			return functype.from_param(value)
+		
+		attrs = {'_argtypes_': functype._argtypes_, '_restype_': functype._restype_, '_flags_': functype._flags_, 'from_param': classmethod(from_param)}
+		result = self._params[functype] = type(functype.__name__, (functype,), attrs)
+		return result
+
+class BufferPool(object):
+
+	'''
+		BufferPool class - Reusable buffers
+		
+		Keeps released ctypes objects, to hand them out again instead of allocating new ones. Buffers are kept by type,
+		size class and alignment: arrays are rounded up to a power of two elements, so an array may be longer than
+		requested. Each thread has its own free lists, and keeps at most "budget" bytes, so taking and releasing
+		buffers needs no locking. Set "clear" to zero buffers when they are released. Buffers remember the pool that
+		lent them until they are released, so releasing a buffer twice, or one from elsewhere, is an error.
+		
+		Exported functions take buffers from the pool implicitly, when a lease ("borrow") is passed for a pointer or
+		array parameter. The lease takes a buffer of the element type of the parameter, and returns it to the pool
+		when it is released.
+	'''
+	
+	class State(object):
+		'''Free lists and counters of a thread'''
+		def __init__(self):
+			self.lists = {}
+			self.retained = self.hits = self.misses = self.dropped = 0
+	
+	def __init__(self, budget=1 << 20, clear=False):
+		self.budget = budget
+		self.clear = clear
+		self._local = threading.local()
+		self._lock = threading.Lock()
+		self._states = []
+	
+	def _state(self):
+		'''Return the state of the current thread'''
+		try:
+			return self._local.state
+		except AttributeError:
+			state = self._local.state = BufferPool.State()
+			with self._lock:
+				self._states.append(state)
+			return state
+	
+	def take(self, type, count=None, align=None):
+		'''
+		Return an instance of "type", or an array of at least "count" elements of it, at an address that is a multiple
+		of "align" bytes, if it is given
+		'''
+		state = self._state()
+		if count is not None:
+			count = 1 << (int(count) - 1).bit_length() if count > 1 else 1
+		free = state.lists.get((type, count, align))
+		if free:
+			result = free.pop()
+			state.hits += 1
+			state.retained -= ctypes.sizeof(result)
+			result._lender = self
+			return result
+		
+		state.misses += 1
+		result = Utils.aligned(type, count, align)
+		result._poolkey = (type, count, align)
+		result._lender = self
+		return result
+	
+	def release(self, buffer):
+		'''
+		Return a buffer to the pool. Returns False if it was dropped, because the pool is full. Raises ValueError if
+		the buffer was not taken from this pool, or was already released.
+		'''
+		if getattr(buffer, '_lender', None) is not self:
+			raise ValueError('Buffer was not taken from this pool, or was already released')
+		buffer._lender = None
+		state = self._state()
+		size = ctypes.sizeof(buffer)
+		if state.retained + size > self.budget:
+			state.dropped += 1
+			return False
+		if self.clear:
+			ctypes.memset(buffer, 0, size)
+		state.retained += size
+		free = state.lists.get(buffer._poolkey)
+		if free is None:
+			free = state.lists[buffer._poolkey] = []
+		free.append(buffer)
+		return True
+	
+	def borrow(self, count=None, align=None):
+		'''Return a lease, that takes a buffer when it is passed to an exported function. See Lease.'''
+		return BufferPool.Lease(self, count, align)
+	
+	def stats(self):
+		'''Return the number of hits and misses, the hit rate, and the bytes retained by all threads, as a dictionary'''
+		with self._lock:
+			states = list(self._states)
+		hits, misses = sum(x.hits for x in states), sum(x.misses for x in states)
+		return {
+			'hits': hits,
+			'misses': misses,
+			'hit_rate': float(hits) / (hits + misses) if hits + misses else 0.0,
+			'dropped': sum(x.dropped for x in states),
+			'retained': sum(x.retained for x in states),
+			'budget': self.budget,
+		}
+	
+	def reset(self):
+		'''Drop the buffers of all threads, and reset the statistics'''
+		with self._lock:
+			for state in self._states:
+				state.__init__()
+	
+	class Lease(object):
+		'''
+		A buffer taken from a pool on first use. Exported functions take it with the element type of their parameter,
+		and "count" elements (one element for pointers, the whole array for arrays, if it is None), aligned to "align"
+		bytes if it is given. The buffer is returned to the pool by "release", or at the end of a with statement.
+		'''
+		
+		def __init__(self, pool, count=None, align=None):
+			self.pool = pool
+			self.count = count
+			self.align = align
+			self.buffer = None
+		
+		def take(self, type, count=None):
+			'''Take the buffer from the pool, or return the buffer that was already taken'''
+			if self.buffer is None:
+				self.buffer = self.pool.take(type, self.count if self.count is not None else count, self.align)
+			return self.buffer
+		
+		def release(self):
+			if self.buffer is not None:
+				buffer, self.buffer = self.buffer, None
+				self.pool.release(buffer)
+		
+		def __enter__(self):
+			return self
+		
+		def __exit__(self, *exc_info):
+			self.release()
+
+class TypePool(object):
+
+	'''
+		TypePool class - Types shared by the libraries of a process
+		
+		Holds the definitions of the type fragments included by descriptors, compiled once for each version of the
+		fragment file. Structures and unions are interned by their structural identity: the kind, the name and the
+		fields, with the types of the fields resolved. Fragments that describe the same structure get the same ctypes
+		class, so values pass between the libraries that include them without conversion.
+	'''
+	
+	def __init__(self):
+		self._types = {}
+		self._fragments = weakref.WeakKeyDictionary()
+		self._lock = threading.RLock()
+		self.hits = self.misses = 0
+	
+	def fragment(self, loader, filename, active=()):
+		'''Return the definitions of a fragment file by name, compiled on first use'''
+		return self.entry(loader, filename, active)[0]
+	
+	def entry(self, loader, filename, active=()):
+		'''
+		Return the definitions of a fragment file by name, compiled on first use, and the signatures of the files they
+		come from: the fragment and the fragments it includes, as their name, modification time, size and hash.
+		'''
+		filename = os.path.abspath(filename)
+		stat = os.stat(filename)
+		key = (filename, stat.st_mtime, stat.st_size)
+		with self._lock:
+			# Fragments are compiled for each type system, and dropped with it
+			fragments = self._fragments.get(loader.types)
+			if fragments is None:
+				fragments = self._fragments[loader.types] = {}
+			entry = fragments.get(key)
+			if entry is not None:
+				self.hits += 1
+				return entry
+			if filename in active:
+				raise ValueError('"{filename}": Circular include!'.format(filename=filename))
+			self.misses += 1
+			config = loader.read_fragment(filename)
+			namespace = self.compile(loader, filename, config, active + (filename,))
+			files = ((filename,) + config['signature'],)
+			for include in config.get('include', []):
+				files += tuple(x for x in self.entry(loader, os.path.join(os.path.dirname(filename), include))[1] if x not in files)
+			entry = fragments[key] = (namespace, files)
+			return entry
+	
+	def compile(self, loader, filename, config, active=()):
+		'''Define the constants and types of a fragment, reusing the interned structures and unions'''
+		namespace = collections.OrderedDict()
+		for include in config.get('include', []):
+			for name, value in self.fragment(loader, os.path.join(os.path.dirname(filename), include), active).items():
+				self.define(namespace, name, value)
+		defines = config['define']
+		for id, kind, value in defines.get('const', []):
+			loader.define_const(namespace, id, kind, value)
+		
+		# Structural keys of the structures and unions, and the ones that are interned already
+		entries = collections.OrderedDict((entry[0], entry) for entry in defines.get('type', []))
+		keys, created = {}, []
+		for id, kind, value in entries.values():
+			if kind in ('S', 'struct', 'U', 'union'):
+				key = keys[id] = self.key(loader, entries, namespace, id, keys, ())
+				if key in self._types:
+					self.define(namespace, id, self._types[key])
+				else:
+					self.define(namespace, id, type(istr(id), (ctypes.Structure if kind in ('S', 'struct') else ctypes.Union,), {}))
+					created.append((id, value))
+		
+		# Other types in order, then the fields of the new structures and unions
+		for id, kind, value in entries.values():
+			if kind in ('S', 'struct', 'U', 'union'):
+				continue
+			if id in namespace:
+				raise ValueError('"{id}": Duplicate identifier!'.format(id=id))
+			if kind in ('E', 'enum'):
+				enumtype, values = loader.enum_values(value)
+				self.define(namespace, id, enumtype)
+				for name, number in values:
+					self.define(namespace, name, number)
+			else:
+				loader.define_type(namespace, id, kind, value)
+		for id, value in created:
+			if value is not None:
+				loader.define_fields(namespace, id, namespace[id], value)
+		
+		# Intern when complete
+		for id, _ in created:
+			self._types[keys[id]] = namespace[id]
+		return namespace
+	
+	@staticmethod
+	def define(namespace, name, value):
+		if namespace.get(name, value) is not value:
+			raise ValueError('"{id}": Duplicate identifier!'.format(id=name))
+		namespace[name] = value
+	
+	def key(self, loader, entries, namespace, id, keys, active):
+		'''Return the structural identity of a structure or union of a fragment'''
+		if id in keys:
+			return keys[id]
+		if id in active:
+			# Refers to itself through a pointer
+			return ('self', id)
+		_, kind, value = entries[id]
+		fields = []
+		for entry in Utils.typecheck(value or [], list):
+			name, fieldtype = entry if isinstance(entry, list) else [x.strip() for x in entry.split(':', 1)]
+			fields.append((istr(name), self.canonical(loader, entries, namespace, fieldtype, keys, active + (id,))))
+		return ('S' if kind in ('S', 'struct') else 'U', istr(id), value is not None, tuple(fields))
+	
+	def canonical(self, loader, entries, namespace, type, keys, active):
+		'''Return a type tree with the names replaced by what they refer to'''
+		if not isinstance(type, tuple):
+			type = loader.types.parse(type)
+		if type in ('()', '...'):
+			return type
+		op, nodes = type[0], type[1:]
+		if op == 'id':
+			name = nodes[0]
+			if name in entries:
+				kind, value = entries[name][1:]
+				if kind in ('S', 'struct', 'U', 'union'):
+					return ('ref', self.key(loader, entries, namespace, name, keys, active))
+				elif kind in ('=', 'alias'):
+					return self.canonical(loader, entries, namespace, value, keys, active)
+				return ('enum', loader.enum_values(value)[0])
+			try:
+				value = namespace[name] if name in namespace else loader.types.find(name)
+			except KeyError:
+				raise Utils.dontchain(ValueError('Undefined type: %s' % name))
+			return ('type', value)
+		elif op == '->':
+			return (op, tuple(self.canonical(loader, entries, namespace, x, keys, active) for x in nodes[0]), self.canonical(loader, entries, namespace, nodes[1], keys, active), nodes[2])
+		return (op, self.canonical(loader, entries, namespace, nodes[0], keys, active)) + tuple(nodes[1:])
+	
+	def stats(self):
+		'''Return the number of fragments and interned types, and the fragment cache hits and misses, as a dictionary'''
+		with self._lock:
+			return {'fragments': sum(len(x) for x in self._fragments.values()), 'types': len(self._types), 'hits': self.hits, 'misses': self.misses}
+
+class WorkerError(RuntimeError):
+	'''Raised by the calls of a ProcessLibrary, when its worker process died during the call'''
+
+class ProcessLibrary(Library):
+
+	'''
+		ProcessLibrary class - A library running in worker processes
+		
+		For libraries that keep global state, and are not thread-safe. Each worker process loads its own copy of the
+		binary, and exported functions are called in a free worker, so calls made from several threads at once (or
+		through "_aio") run in parallel. Definitions are created in the calling process as usual, so types and
+		constants work the same way as in a Library. The workers use a loader with the same options and type sets,
+		and calls are instrumented in the calling process.
+		
+		Arguments and results are sent over pipes. Structures, arrays and buffers are copied to the worker, and back
+		after the call, unless they are read-only. Buffers of at least "shared" bytes are copied through shared memory
+		instead of the pipe, at a multiple of ALIGN bytes. ctypes objects keep their alignment in the worker, up to a
+		page. Buffers created with "_shared" live in shared memory, and are never copied. Strings (c_char_p and
+		c_wchar_p) are passed by value. Pointers, void pointers and callbacks can not be passed to other processes,
+		pointer results are returned as addresses in the worker, and variables of the binary are not accessible.
+		
+		If a worker process dies, the call raises WorkerError, and a new worker is started in its place.
+	'''
+	
+	ALIGN = 64
+	
+	class Worker(object):
+		'''A worker process, and its end of the pipe'''
+		def __init__(self, process, connection):
+			self.process = process
+			self.connection = connection
+			# Shared memory for large buffers, grown on demand
+			self.scratch = None
+	
+	def __init__(self, loader, binary, processes, shared=1 << 16, start=None):
+		Library.__init__(self, loader, binary)
+		self._options = self._settings(loader)
+		self._processes = processes
+		self._threshold = shared
+		self._start = start
+		self._workers = None
+		self._idle = None
+		self._segments = []
+		self._workers_lock = threading.Lock()
+		self._calls = self._crashes = 0
+	
+	def _resolve(self, name, attrname):
+		with self._lock:
+			delayed = self._delayed.get(name)
+			if delayed is None or delayed[0] not in ('F', 'V'):
+				return Library._resolve(self, name, attrname)
+			if delayed[0] == 'V':
+				raise TypeError('"{name}": Variables of a library in worker processes are not accessible'.format(name=name))
+			
+			def call(*args):
+				return self._call(name, args)
+			
+			if self._loader.instrument:
+				call = self._instrument(name, call)
+			call.__name__ = istr(name)
+			result = self.__dict__[attrname] = call
+			del self._delayed[name]
+			return result
+	
+	def _instrument(self, name, call):
+		'''Wrap a call, to record it in the stats of the loader. The time includes sending it to the worker and back.'''
+		key = (os.path.splitext(os.path.basename(self._filename))[0], name)
+		record = self._loader.stats.record
+		callsites = self._loader.instrument == 'callsites'
+		clock = Utils.clock
+		
+		def instrumented(*args):
+			start = clock()
+			result = call(*args)
+			if callsites:
+				frame = sys._getframe(1)
+				record(key, clock() - start, 0.0, (frame.f_code.co_filename, frame.f_lineno))
+			else:
+				record(key, clock() - start, 0.0)
+			return result
+		
+		instrumented.__wrapped__ = call
+		return instrumented
+	
+	@staticmethod
+	def _settings(loader):
+		'''
+		Return the options of a loader, that the workers load the library with. Their types are created from the same
+		type sets, so types registered on the loader by hand, and other type systems, can not be used.
+		'''
+		types = loader.types
+		if type(types) is not Types or types._list != Types(types.typesets, cachesize=0)._list:
+			raise ValueError('Worker processes only support the type sets of Types, not types registered by hand or other type systems')
+		return {
+			'path': loader.path, 'extensions': loader.extensions, 'compiled': loader.compiled, 'typesets': types.typesets,
+			'mode': loader.mode, 'check_symbols': loader.check_symbols, 'readonly_buffers': loader.readonly_buffers,
+			'pool_budget': loader.pool.budget, 'pool_clear': loader.pool.clear,
+		}
+	
+	def _spawn(self):
+		'''Start a worker process, and wait until it loaded the library'''
+		import multiprocessing
+		context = multiprocessing.get_context(self._start) if hasattr(multiprocessing, 'get_context') else multiprocessing
+		connection, child = context.Pipe()
+		process = context.Process(target=ProcessLibrary._serve, args=(child, self._filename, self._binary._name, self._options))
+		process.daemon = True
+		process.start()
+		child.close()
+		worker = ProcessLibrary.Worker(process, connection)
+		try:
+			kind, value = connection.recv()
+		except (EOFError, OSError):
+			kind, value = 'E', WorkerError('"{filename}": Worker process exited with code {code}'.format(filename=self._filename, code=self._exitcode(worker)))
+		if kind == 'E':
+			process.join()
+			raise value
+		return worker
+	
+	def _call(self, name, args):
+		'''Call an exported function in a free worker'''
+		with self._workers_lock:
+			if self._workers is None:
+				try:
+					import queue
+				except ImportError:
+					import Queue as queue
+				self._idle = queue.Queue()
+				self._workers = [self._spawn() for _ in range(self._processes)]
+				for worker in self._workers:
+					self._idle.put(worker)
+		
+		worker = self._idle.get()
+		try:
+			encoded, writeback, copies = self._encode(worker, args)
+			try:
+				worker.connection.send((name, encoded))
+				kind, value, written = worker.connection.recv()
+			except (EOFError, OSError):
+				code = self._exitcode(worker)
+				worker = self._respawn(worker)
+				raise WorkerError('"{name}": Worker process exited with code {code}'.format(name=name, code=code))
+			
+			# Copy back the written buffers, before the shared memory of the worker is reused
+			for index, data in written:
+				writeback[index](data)
+			for copy in copies:
+				copy()
+		finally:
+			self._idle.put(worker)
+		
+		with self._workers_lock:
+			self._calls += 1
+		if kind == 'E':
+			raise value
+		return self._decode(value)
+	
+	def _respawn(self, worker):
+		'''Replace a dead worker'''
+		with self._workers_lock:
+			self._crashes += 1
+		self._release(worker)
+		replacement = self._spawn()
+		with self._workers_lock:
+			self._workers[self._workers.index(worker)] = replacement
+		return replacement
+	
+	@staticmethod
+	def _exitcode(worker):
+		worker.process.join(5)
+		return worker.process.exitcode
+	
+	def _scratch(self, worker, size):
+		'''Return the shared memory of a worker for large buffers, with at least "size" bytes'''
+		if worker.scratch is None or worker.scratch.size < size:
+			from multiprocessing import shared_memory
+			if worker.scratch is not None:
+				worker.scratch.close()
+				worker.scratch.unlink()
+			worker.scratch = shared_memory.SharedMemory(create=True, size=1 << (size - 1).bit_length())
+		return worker.scratch
+	
+	def _shared(self, size):
+		'''
+		Return a new buffer of "size" bytes in shared memory (a multiprocessing.shared_memory.SharedMemory). Its
+		contents ("buf") are passed to the workers without copying. It is released by "_close".
+		'''
+		from multiprocessing import shared_memory
+		segment = shared_memory.SharedMemory(create=True, size=size)
+		with self._workers_lock:
+			self._segments.append(segment)
+		return segment
+	
+	def _encode(self, worker, args):
+		'''
+		Encode the arguments of a call. Returns them with the functions that copy back the buffers written by the
+		worker: by index for the buffers sent over the pipe, and a list for the buffers in shared memory.
+		'''
+		encoded, writeback, large, copies = [], {}, [], []
+		for index, arg in enumerate(args):
+			if ProcessLibrary._isaddress(type(arg)) or callable(arg) and not isinstance(arg, type):
+				raise TypeError('Argument {index}: Pointers and callbacks can not be passed to worker processes'.format(index=index))
+			if type(arg).__name__ == 'SharedMemory' and hasattr(arg, 'buf'):
+				encoded.append(('M', arg.name, 0, arg.size, False))
+			elif isinstance(arg, (ctypes.c_char_p, ctypes.c_wchar_p)):
+				# Strings are copied by value, the worker passes a pointer to its copy
+				encoded.append(('P', arg.value))
+			elif isinstance(arg, (ctypes.Structure, ctypes.Union, ctypes.Array, ctypes._SimpleCData)):
+				# Values are copied to memory with the same alignment in the worker, up to a page
+				address = ctypes.addressof(arg)
+				encoded.append(('V', ProcessLibrary._typename(type(arg)), ctypes.string_at(address, ctypes.sizeof(arg)), Utils.alignment(address)))
+				writeback[index] = lambda data, arg=arg: ctypes.memmove(ctypes.addressof(arg), data, len(data))
+			elif isinstance(arg, (bytes, bytearray, memoryview, array.array, mmap.mmap)) or hasattr(arg, '__array_interface__'):
+				view = memoryview(arg).cast('B')
+				if view.nbytes >= self._threshold:
+					large.append((index, view))
+					encoded.append(None)
+				else:
+					encoded.append(('B', view.tobytes(), view.readonly))
+					if not view.readonly:
+						writeback[index] = lambda data, view=view: view.__setitem__(slice(0, len(data)), data)
+			else:
+				encoded.append(('P', arg))
+		
+		# Large buffers are copied through the shared memory of the worker, each at a multiple of ALIGN bytes
+		if large:
+			align = ProcessLibrary.ALIGN
+			scratch = self._scratch(worker, sum(-(-view.nbytes // align) * align for _, view in large))
+			offset = 0
+			for index, view in large:
+				offset = -(-offset // align) * align
+				scratch.buf[offset:offset + view.nbytes] = view
+				encoded[index] = ('M', scratch.name, offset, view.nbytes, view.readonly)
+				if not view.readonly:
+					copies.append(lambda view=view, start=offset: view.__setitem__(slice(None), scratch.buf[start:start + view.nbytes]))
+				offset += view.nbytes
+		return encoded, writeback, copies
+	
+	@staticmethod
+	def _isaddress(ctype):
+		'''Return whether the values of a ctypes type are addresses: pointers, and arrays of pointers or strings'''
+		nested = False
+		while issubclass(ctype, ctypes.Array):
+			ctype, nested = ctype._type_, True
+		if issubclass(ctype, (ctypes._Pointer, ctypes._CFuncPtr)):
+			return True
+		return issubclass(ctype, ctypes._SimpleCData) and ctype._type_ in ('PzZ' if nested else 'P')
+	
+	def _decode(self, value):
+		'''Decode a result encoded by the worker'''
+		kind = value[0]
+		if kind == 'P':
+			return value[1]
+		elif kind == 'T':
+			return tuple(self._decode(x) for x in value[1])
+		return ProcessLibrary._typeof(self, value[1]).from_buffer_copy(value[2])
+	
+	@staticmethod
+	def _typename(ctype):
+		'''Return the name of a ctypes type, by which the other process finds it'''
+		if issubclass(ctype, (ctypes.Structure, ctypes.Union)):
+			return ('T', ctype.__name__)
+		elif issubclass(ctype, ctypes.Array):
+			return ('A', ProcessLibrary._typename(ctype._type_), ctype._length_)
+		elif issubclass(ctype, ctypes._SimpleCData) and getattr(ctypes, ctype.__name__, None) is ctype:
+			return ('C', ctype.__name__)
+		raise TypeError('"{name}": Type can not be passed to worker processes'.format(name=ctype.__name__))
+	
+	@staticmethod
+	def _typeof(library, name):
+		'''Return the ctypes type of a name returned by "_typename"'''
+		if name[0] == 'T':
+			return library[name[1]]
+		elif name[0] == 'A':
+			return ProcessLibrary._typeof(library, name[1]) * name[2]
+		return getattr(ctypes, name[1])
+	
+	@staticmethod
+	def _serve(connection, filename, binary, options):
+		'''Main function of the worker processes'''
+		try:
+			loader = Loader(path=options['path'], extensions=options['extensions'], types=Types(options['typesets']), compiled=options['compiled'])
+			loader.mode, loader.check_symbols, loader.readonly_buffers = options['mode'], options['check_symbols'], options['readonly_buffers']
+			loader.pool = BufferPool(budget=options['pool_budget'], clear=options['pool_clear'])
+			library = loader.load(filename, binary=binary, delayed=True, private=True)
+		except Exception as ex:
+			connection.send(('E', ProcessLibrary._picklable(ex)))
+			return
+		connection.send(('R', None))
+		
+		segments = collections.OrderedDict()
+		def attach(name):
+			segment = segments.pop(name, None)
+			if segment is None:
+				from multiprocessing import shared_memory
+				try:
+					segment = shared_memory.SharedMemory(name=name, track=False)
+				except TypeError:
+					# Before python 3.13, attaching registers the memory again with the resource tracker of the parent
+					segment = shared_memory.SharedMemory(name=name)
+			segments[name] = segment
+			return segment
+		
+		while True:
+			try:
+				name, encoded = connection.recv()
+			except (EOFError, OSError):
+				return
+			args, written = [], []
+			try:
+				for index, arg in enumerate(encoded):
+					kind = arg[0]
+					if kind == 'P':
+						args.append(arg[1])
+					elif kind == 'B':
+						args.append(arg[1] if arg[2] else bytearray(arg[1]))
+						if not arg[2]:
+							written.append((index, args[-1]))
+					elif kind == 'M':
+						view = attach(arg[1]).buf[arg[2]:arg[2] + arg[3]]
+						args.append(view.toreadonly() if arg[4] else view)
+					else:
+						value = Utils.aligned(ProcessLibrary._typeof(library, arg[1]), align=arg[3])
+						ctypes.memmove(ctypes.addressof(value), arg[2], len(arg[2]))
+						args.append(value)
+						written.append((index, value))
+				result = ('R', ProcessLibrary._result(library[name](*args)), [(index, bytes(x) if isinstance(x, bytearray) else ctypes.string_at(ctypes.addressof(x), ctypes.sizeof(x))) for index, x in written])
+			except Exception as ex:
+				result = ('E', ProcessLibrary._picklable(ex), [])
+			del args[:], written[:]
+			connection.send(result)
+			
+			# Keep the last few shared memory blocks attached
+			while len(segments) > 8:
+				try:
+					segments.popitem(last=False)[1].close()
+				except BufferError:
+					pass
+	
+	@staticmethod
+	def _result(value):
+		'''Encode a result in the worker'''
+		if isinstance(value, tuple):
+			return ('T', [ProcessLibrary._result(x) for x in value])
+		elif isinstance(value, (ctypes.Structure, ctypes.Union, ctypes.Array)):
+			return ('V', ProcessLibrary._typename(type(value)), ctypes.string_at(ctypes.addressof(value), ctypes.sizeof(value)))
+		elif isinstance(value, (ctypes._Pointer, ctypes._CFuncPtr, ctypes.c_void_p)):
+			# Only meaningful in the worker
+			return ('P', ctypes.cast(value, ctypes.c_void_p).value)
+		return ('P', value)
+	
+	@staticmethod
+	def _picklable(ex):
+		'''Return an exception, or a replacement for it if it can not be pickled'''
+		import pickle
+		try:
+			pickle.loads(pickle.dumps(ex))
+			return ex
+		except Exception:
+			return RuntimeError('{type}: {error}'.format(type=type(ex).__name__, error=str(ex)))
+	
+	def _metrics(self):
+		'''Return the number of workers, calls and crashes, as a dictionary'''
+		with self._workers_lock:
+			return {'processes': self._processes, 'started': len(self._workers or ()), 'calls': self._calls, 'crashes': self._crashes}
+	
+	def _release(self, worker):
+		worker.connection.close()
+		if worker.process.is_alive():
+			worker.process.terminate()
+		worker.process.join()
+		if worker.scratch is not None:
+			worker.scratch.close()
+			worker.scratch.unlink()
+			worker.scratch = None
+	
+	def _close(self):
+		'''Stop the workers, and release the shared memory'''
+		with self._workers_lock:
+			workers, self._workers = self._workers or [], None
+			segments, self._segments = self._segments, []
+		for worker in workers:
+			self._release(worker)
+		for segment in segments:
+			segment.close()
+			segment.unlink()
+
+class SymbolError(ValueError):
+	'''Raised when loading a library with "check_symbols", when some of its exported symbols are missing'''
+	
+	def __init__(self, filename, missing):
+		ValueError.__init__(self, '"{filename}": {count} symbols not found: {names}'.format(filename=filename, count=len(missing), names=', '.join(missing)))
+		self.filename = filename
+		# Missing symbols in the order of the descriptor
+		self.missing = missing
+
+class LoadError(ValueError):
+	'''Raised by "load_many", when some of the libraries failed to load'''
+	
+	def __init__(self, libraries, errors):
+		ValueError.__init__(self, '{count} libraries failed to load: {names}'.format(count=len(errors), names=', '.join(sorted(errors))))
+		# Loaded libraries in order, None for the ones that failed
+		self.libraries = libraries
+		# Errors by filename
+		self.errors = errors
+
+class Loader(object):
+	# File format version of the library descriptor JSON
+	FORMAT_VERSION = 2
+
+	# Path for loading dlls
+	path = ['.'] + list(sys.path)
+	# Extensions of the library binary
+	extensions = ['dlib'] + {'nt': ['dll'], 'posix': ['so']}.get(os.name, [])
+	# Binary cache to avoid loading a library multiple times
+	binary_cache = weakref.WeakValueDictionary()
+	# Types of the included fragments, shared by all loaders (See TypePool)
+	type_pool = TypePool()
+	# Flags of dlopen by name, and the default flags (None for the ctypes default). The "mode" key of descriptors
+	# overrides it, see "dlopen_mode".
+	DLOPEN_FLAGS = {
+		'now': 'RTLD_NOW', 'lazy': 'RTLD_LAZY', 'global': 'RTLD_GLOBAL', 'local': 'RTLD_LOCAL',
+		'nodelete': 'RTLD_NODELETE', 'noload': 'RTLD_NOLOAD', 'deepbind': 'RTLD_DEEPBIND',
+	}
+	mode = None
+	# Check all the exported symbols when loading, also set by the "check_symbols" key of descriptors
+	check_symbols = False
+	# Save precompiled descriptors next to the descriptor files
+	compiled = True
+	# Number of results stored at once by batch calls
+	BATCH_CHUNK = 4096
+	# Accept read-only buffers for pointer parameters of exported functions
+	readonly_buffers = False
+	# Record call statistics of exported functions: False, True or 'callsites' (also record the callers)
+	instrument = False
+	# Number of worker threads running the async calls of each library (See AsyncCalls)
+	aio_workers = 4
+	# Bytes kept by the buffer pool, and whether released buffers are zeroed (See BufferPool)
+	pool_budget = 1 << 20
+	pool_clear = False
+	# Start method of the worker processes of libraries loaded with "processes", and the size from which buffers are
+	# passed to them through shared memory (See ProcessLibrary)
+	process_start = 'spawn'
+	process_shared = 1 << 16
+	# Record the exports resolved by delayed libraries, and save them next to the descriptor at exit ("profile"), and
+	# resolve the exports of a saved profile on a background thread after loading ("warmup")
+	profile = False
+	warmup = False
+	# Directories modified less than this many seconds ago are not indexed by "locate"
+	LOCATE_RACY = 2.0
+
+	def __init__(self, path=None, extensions=None, types=None, compiled=None):
+		# Public dlls are cached by the loader. Loaders do not share caches
+		self.cache = {}
+		
+		# Set path, extensions and compiled cache
+		if path is not None:
+			self.path = path
+		if extensions is not None:
+			self.extensions = extensions
+		if compiled is not None:
+			self.compiled = compiled
+		
+		# Create type system with default type sets
+		self.types = types or Types(typesets='simple')
+		
+		# Call statistics of instrumented functions
+		self.stats = CallStats()
+		
+		# Reusable buffers
+		self.pool = BufferPool(budget=self.pool_budget, clear=self.pool_clear)
+		
+		# Libraries recording a usage profile, saved at exit
+		self._profiles = None
+		self._profiles_lock = threading.Lock()
+		
+		# Index of the directories searched by "locate", and counters of the stat calls made and saved
+		self.locate_index = {}
+		self.locate_stats = {'lookups': 0, 'stats': 0, 'scans': 0, 'saved': 0}
+	
+	def load(self, filename, binary=None, delayed=False, private=False, processes=None):
+		'''
+		Load a library from its descriptor. With "processes", the exported functions run in that many worker
+		processes, each with its own copy of the binary. These libraries are never cached. See ProcessLibrary.
+		'''
+		# Normalize filename
+		filename = os.path.abspath(filename)
+		if processes:
+			return self.link(filename, self.read(filename), binary=binary, delayed=delayed, processes=processes)
+	
+		# Load from cache
+		if not private:
+			library = self.cache.get(filename)
+			if library is not None:
+				return library
+				
+		# Load library descriptor
+		config = self.read(filename)
+		library = self.link(filename, config, binary=binary, delayed=delayed)
+		
+		# Save and return library
+		if not private:
+			self.cache[filename] = library
+		return library
+	
+	def load_many(self, filenames, delayed=False, private=False, workers=4):
+		'''
+		Load multiple library descriptors.
+		
+		Descriptors are read and precompiled on a pool of worker threads, then the libraries are created one by one in
+		the order of the filenames, the same way "load" would. Returns the list of libraries in the same order. If some
+		of the descriptors fail to load, the rest are still loaded (and cached), and a LoadError is raised that holds
+		both the libraries, and the errors.
+		'''
+		
+		# Normalize filenames
+		filenames = [os.path.abspath(filename) for filename in filenames]
+		
+		# Read descriptors that are not cached
+		pending = []
+		for filename in filenames:
+			if (private or filename not in self.cache) and filename not in pending:
+				pending.append(filename)
+		
+		def read(filename):
+			try:
+				return self.read(filename), None
+			except Exception as ex:
+				return None, ex
+		
+		if workers > 1 and len(pending) > 1:
+			from multiprocessing.pool import ThreadPool
+			pool = ThreadPool(min(workers, len(pending)))
+			try:
+				configs = dict(zip(pending, pool.map(read, pending)))
+			finally:
+				pool.close()
+		else:
+			configs = dict((filename, read(filename)) for filename in pending)
+		
+		# Create libraries in order
+		libraries, errors = [], {}
+		for filename in filenames:
+			library = None
+			if not private:
+				library = self.cache.get(filename)
+			if library is None and filename not in errors:
+				config, error = configs[filename]
+				try:
+					if error is not None:
+						raise error
+					library = self.link(filename, config, delayed=delayed)
+					if not private:
+						self.cache[filename] = library
+				except Exception as ex:
+					errors[filename] = ex
+			libraries.append(library)
+		
+		if errors:
+			raise LoadError(libraries, errors)
+		return libraries
+	
+	def link(self, filename, config, binary=None, delayed=False, processes=None):
+		'''Create a library from a descriptor returned by "read"'''
+		binary = self.open_binary(filename, config, binary=binary)
+		if config.get('check_symbols', self.check_symbols):
+			self.check_exports(filename, binary, config['library'])
+		
+		# Create library, the exports of libraries in worker processes are bound on first use
+		if processes:
+			library = ProcessLibrary(loader=self, binary=binary, processes=processes, shared=self.process_shared, start=self.process_start)
+		else:
+			library = Library(loader=self, binary=binary)
+		self.init_library(library, filename, config)
+		config = config['library']
+		self.load_includes(library, filename, config.get('include', []))
+		self.load_defines(library, config['define'], delayed=delayed)
+		self.load_exports(library, config['export'], delayed=delayed or bool(processes))
+		self.start_warmup(library, delayed=delayed)
+		return library
+	
+	def init_library(self, library, filename, config):
+		'''Set the attributes of a library from its descriptor'''
+		library._filename = filename
+		library._signature = ((filename,) + tuple(config['signature']),) if config.get('signature') else None
+		library._config = config['library']
+		library._gil = config['library'].get('gil', 'release')
+		library.version = config['library']['version']
+		library._version = library.version
+		library.description = config['library']['description']
+		library._description = library.description
+	
+	def open_binary(self, filename, config, binary=None):
+		'''
+		Locate and open the binary of a library, or return it from the binary cache. The binary is opened with the
+		dlopen flags of the "mode" key of the descriptor, or of the loader. See "dlopen_mode".
+		'''
+		
+		# Locate binary
+		defpath = os.path.dirname(filename)
+		defname = os.path.splitext(os.path.basename(filename))[0]
+		if binary is None:
+			binary = config.get('binary', '*.*')
+		binary = binary.replace('*', defname, 1)
+		binary = self.locate(binary, path = [defpath] + self.path, extensions=self.extensions)
+		if binary is None:
+			raise ValueError('"{filename}": Not found!'.format(filename=filename))
+		
+		# Binaries opened with other flags are cached separately, so that dlopen applies the flags
+		mode = self.dlopen_mode(config)
+		key = binary if mode == ctypes.DEFAULT_MODE else (binary, mode)
+		try:
+			return self.binary_cache[key]
+		except KeyError:
+			result = self.binary_cache[key] = ctypes.CDLL(binary, mode=mode)
+			return result
+	
+	def dlopen_mode(self, config):
+		'''
+		Return the dlopen flags of a descriptor: the flag names of its "mode" key, or else of the "mode" of the loader,
+		as a list or a string separated by "|". Without either, the ctypes default is used.
+		'''
+		flags = config.get('mode', self.mode)
+		if flags is None:
+			return ctypes.DEFAULT_MODE
+		if isinstance(flags, (str, istr)):
+			flags = [x.strip() for x in flags.split('|')]
+		mode = 0
+		for flag in Utils.typecheck(flags, (list, tuple)):
+			if flag not in self.DLOPEN_FLAGS:
+				raise ValueError('Value of "mode" must be in {expected}!'.format(expected=tuple(sorted(self.DLOPEN_FLAGS))))
+			# Flags missing on this platform are ignored
+			name = self.DLOPEN_FLAGS[flag]
+			mode |= getattr(os, name, getattr(ctypes, name, 0))
+		return mode
+	
+	def check_exports(self, filename, binary, config):
+		'''
+		Look up the symbols of all the exports of a descriptor in its binary in one pass, instead of one at a time when
+		they are first used. Raises SymbolError with all the missing symbols.
+		'''
+		names = []
+		for section in ('function', 'variable'):
+			names.extend(entry[1] or entry[0] for entry in config['export'].get(section, []))
+		missing = Utils.missing_symbols(binary, names)
+		if missing:
+			raise SymbolError(filename, missing)
+	
+	def start_warmup(self, library, delayed=False):
+		'''
+		Start recording the usage profile of a delayed library, and resolving the exports of its saved profile on a
+		background thread, as set by "profile" and "warmup". The "_warmup" event of the library is set when done, right
+		away if there is nothing to resolve.
+		'''
+		if delayed and self.profile:
+			library._profile = []
+			with self._profiles_lock:
+				if self._profiles is None:
+					self._profiles = weakref.WeakSet()
+					atexit.register(self.save_profiles)
+				self._profiles.add(library)
+		
+		names = self.read_profile(library._filename) if delayed and self.warmup else []
+		if not names:
+			library._warmup.set()
+			return
+		
+		def warmup():
+			try:
+				for name in names:
+					try:
+						library[name]
+					except Exception:
+						# Removed from the descriptor, or fails to load, which is reported when used
+						pass
+			finally:
+				library._warmup.set()
+		
+		thread = threading.Thread(target=warmup, name='dll-warmup')
+		thread.daemon = True
+		thread.start()
+	
+	def profile_filename(self, filename):
+		'''Return the name of the usage profile of a descriptor'''
+		return filename + '.profile'
+	
+	def read_profile(self, filename):
+		'''Return the export names of the usage profile of a descriptor, in order. Returns [] if it is missing or corrupt.'''
+		try:
+			with io.open(self.profile_filename(filename), 'rb') as file:
+				profile = json.loads(file.read().decode('utf-8'))
+			return [istr(name) for name, _ in profile['exports']]
+		except Exception:
+			return []
+	
+	def save_profile(self, library):
+		'''
+		Atomically write the usage profile of a library next to its descriptor: the exports it resolved, in order, with
+		the time since loading. Exports resolved in the background are kept in the profile. Failing to write the
+		profile is not an error.
+		'''
+		if not library._profile:
+			return
+		filename = self.profile_filename(library._filename)
+		try:
+			fd, tempname = tempfile.mkstemp(dir=os.path.dirname(filename), prefix='.tmp-', suffix='.profile')
+			try:
+				with io.open(fd, 'wb') as file:
+					file.write(json.dumps({'exports': [[name, round(seconds, 6)] for name, seconds in library._profile]}).encode('utf-8'))
+				getattr(os, 'replace', os.rename)(tempname, filename)
+			except BaseException:
+				os.remove(tempname)
+				raise
+		except (OSError, IOError, ValueError):
+			pass
+	
+	def save_profiles(self):
+		'''Save the usage profiles of the libraries of this loader. Called at exit when recording profiles.'''
+		with self._profiles_lock:
+			libraries = list(self._profiles or ())
+		for library in libraries:
+			self.save_profile(library)
+	
+	def isfresh(self, filename):
+		'''
+		Check whether the descriptor of a cached library, and the fragments it includes, are unchanged since it was
+		loaded. Only the modification times and sizes are checked, unless they changed, then the contents are compared
+		too.
+		'''
+		library = self.cache.get(os.path.abspath(filename))
+		if library is None or library._signature is None:
+			return False
+		signature = []
+		for name, mtime, size, digest in library._signature:
+			try:
+				stat = os.stat(name)
+			except OSError:
+				return False
+			if (stat.st_mtime, stat.st_size) != (mtime, size):
+				# Touched, but possibly not changed
+				with io.open(name, 'rb') as file:
+					data = file.read()
+				if hashlib.sha1(data).hexdigest() != digest:
+					return False
+			signature.append((name, stat.st_mtime, stat.st_size, digest))
+		library._signature = tuple(signature)
+		return True
+	
+	def reload(self, filename, binary=None, delayed=False):
+		'''
+		Reload a cached library, if its descriptor changed since it was loaded. Libraries that are not cached are
+		simply loaded.
+		
+		The library object is updated in place. Definitions and exports are only built again if their entry in the
+		descriptor changed, or something they refer to changed (including the definitions of included fragments),
+		otherwise the existing objects are kept. The binary handle is kept, unless the descriptor now refers to a
+		different file. (A binary that changed at the same path can not be reloaded this way, the system keeps using
+		the copy it loaded.)
+		'''
+		filename = os.path.abspath(filename)
+		library = self.cache.get(filename)
+		if library is None:
+			return self.load(filename, binary=binary, delayed=delayed)
+		if self.isfresh(filename):
+			return library
+		
+		# Find the entries that did not change
+		config = self.read(filename)
+		handle = self.open_binary(filename, config, binary=binary)
+		if config.get('check_symbols', self.check_symbols):
+			self.check_exports(filename, handle, config['library'])
+		old, new = self.entries(library._config), self.entries(config['library'])
+		
+		# Create the new library with the kept objects, and the changed entries
+		update = Library(loader=self, binary=handle)
+		self.init_library(update, filename, config)
+		for attrname in ('_lock', '_guards', '_owners', '_staged', '_stager', '_loaded', '_profile', '_warmup'):
+			update.__dict__[attrname] = library.__dict__[attrname]
+		
+		# Trampolines stay alive, C code may still hold them. The async calls keep their workers and metrics, and
+		# resolve the functions again.
+		if '_callbacks' in library.__dict__:
+			update.__dict__['_callbacks'] = library.__dict__['_callbacks']
+		if '_aio' in library.__dict__:
+			update.__dict__['_aio'] = library.__dict__['_aio']
+			update._aio._functions.clear()
+		
+		# Included definitions come first. Entries that refer to the ones that were redefined or removed are changed.
+		self.load_includes(update, filename, config['library'].get('include', []))
+		def included(target, id):
+			return target.__dict__.get('_u' * id.startswith('_') + id)
+		redefined = set(id for id in library._included | update._included if included(library, id) is not included(update, id))
+		
+		keep = self.unchanged(old, new, exports=handle is library._binary, redefined=redefined)
+		for id in keep:
+			attrname = '_u' * id.startswith('_') + id
+			if attrname in library.__dict__:
+				update.__dict__[attrname] = library.__dict__[attrname]
+		
+		def changed(entries):
+			return [x for x in entries if ('_u' * x[0].startswith('_') + x[0]) not in update.__dict__]
+		
+		defines, exports = config['library']['define'], config['library']['export']
+		self.load_defines(update, dict((x, changed(defines.get(x, []))) for x in ('const', 'type')), delayed=delayed)
+		self.load_exports(update, dict((x, changed(exports.get(x, []))) for x in ('function', 'variable')), delayed=delayed)
+		
+		# Update library in place, under its lock, so that delayed names are not resolved in between. The new names are
+		# set at once, and the names that are gone are removed after, so other threads never miss a name that exists.
+		with library._lock:
+			stale = [x for x in library.__dict__ if x not in update.__dict__]
+			library.__dict__.update(update.__dict__)
+			for attrname in stale:
+				del library.__dict__[attrname]
+		self.types.cache_discard(library)
+		return library
+	
+	def entries(self, config):
+		'''
+		Return the entries of a descriptor by name. For each name it holds the descriptor entry, and the names it
+		refers to, or None if they are unknown.
+		'''
+		def refs(types):
+			try:
+				return set(Utils.typeids(x if isinstance(x, tuple) else self.types.parse(x) for x in types))
+			except ValueError:
+				return None
+		
+		def fieldtypes(fields):
+			for field in fields or []:
+				yield field[1] if isinstance(field, list) else field.split(':', 1)[-1]
+		
+		result = {}
+		defines, exports = config.get('define', {}), config.get('export', {})
+		for entry in defines.get('const', []):
+			result[entry[0]] = (('const', entry), set())
+		for entry in defines.get('type', []):
+			id, kind, value = entry
+			if kind in ('=', 'alias'):
+				result[id] = (('type', entry), refs([value]))
+			elif kind in ('E', 'enum'):
+				result[id] = (('type', entry), set())
+				for name in self.enum_names(value):
+					result[name] = (('enum', id), set([id]))
+			else:
+				result[id] = (('type', entry), refs(fieldtypes(value)))
+		for section in ('function', 'variable'):
+			for entry in exports.get(section, []):
+				result[entry[0]] = ((section, entry), refs([entry[2]]))
+		return result
+	
+	@staticmethod
+	def unchanged(old, new, exports=True, redefined=()):
+		'''
+		Return the names whose entries, and the entries they refer to, are the same in "old" and "new". Names in
+		"redefined" are changed, even though they have no entry.
+		'''
+		changed = set(id for id in set(old) | set(new) if id not in old or id not in new or old[id][0] != new[id][0])
+		changed.update(redefined)
+		if not exports:
+			changed.update(id for id, (entry, _) in new.items() if entry[0] in ('function', 'variable'))
+		
+		# Propagate changes to the entries referring to them
+		while True:
+			more = set(id for id, (_, refs) in new.items() if id not in changed and (refs is None or refs & changed))
+			if not more:
+				break
+			changed |= more
+		return set(new) - changed
+	
+	def read(self, filename):
+		'''
+		Read, validate and precompile a library descriptor.
+		
+		Precompiled descriptors have their type strings replaced by parsed types. When the compiled cache is enabled,
+		they are saved next to the descriptor, and reused as long as the descriptor does not change. The modification
+		time, size and hash of the descriptor are added as "signature".
+		'''
+		
+		# Read descriptor
+		with io.open(filename, 'rb') as file:
+			data = file.read()
+			stat = os.fstat(file.fileno())
+		signature = (stat.st_mtime, stat.st_size, hashlib.sha1(data).hexdigest())
+		
+		# Look up in compiled cache
+		if self.compiled:
+			key = (versionstring, self.FORMAT_VERSION, filename) + signature
+			config = self.read_compiled(filename, key)
+			if config is not None:
+				config['signature'] = signature
+				return config
+		
+		# Load library descriptor json with comments removed
+		config = json.loads(re.sub(r'^[ \t]*#.*$', '', data.decode('utf-8'), flags=re.MULTILINE))
+			
+		# Validate file format
+		if config['type'] != 'library':
+			raise ValueError('"{filename}": Value of "type" need to be "{expected}"!'.format(filename=filename, expected="library"))
+		if int(config['version']) != self.FORMAT_VERSION:
+			raise ValueError('"{filename}": Value of "version" need to be "{expected}"!'.format(filename=filename, expected=self.FORMAT_VERSION))
+		
+		# Precompile and save
+		config = self.precompile(config)
+		if self.compiled:
+			self.write_compiled(filename, key, config)
+		
+		# The signature is used to check if the descriptor changed
+		config['signature'] = signature
+		return config
+	
+	def read_fragment(self, filename):
+		'''
+		Read and validate a type fragment, a descriptor with "include" and "define" sections only. The modification
+		time, size and hash of the fragment are added as "signature".
+		'''
+		with io.open(filename, 'rb') as file:
+			data = file.read()
+			stat = os.fstat(file.fileno())
+		config = json.loads(re.sub(r'^[ \t]*#.*$', '', data.decode('utf-8'), flags=re.MULTILINE))
+		if config.get('type') != 'types':
+			raise ValueError('"{filename}": Value of "type" need to be "{expected}"!'.format(filename=filename, expected="types"))
+		if int(config['version']) != self.FORMAT_VERSION:
+			raise ValueError('"{filename}": Value of "version" need to be "{expected}"!'.format(filename=filename, expected=self.FORMAT_VERSION))
+		config.setdefault('define', {})
+		config['signature'] = (stat.st_mtime, stat.st_size, hashlib.sha1(data).hexdigest())
+		return config
+	
+	def load_includes(self, library, filename, includes):
+		'''
+		Define the constants and types of the fragments included by a descriptor. Paths are relative to the descriptor.
+		Fragments are compiled once, and their structures and unions are shared by all libraries. See TypePool.
+		
+		The names defined are added to "_included" of the library, and the signatures of the fragment files to its
+		"_signature", so that "isfresh" checks them too.
+		'''
+		for include in includes:
+			path = os.path.join(os.path.dirname(filename), include)
+			try:
+				namespace, files = self.type_pool.entry(self, path)
+			except (OSError, IOError) as ex:
+				raise ValueError('"{filename}": Include not found: {include}: {error}'.format(filename=filename, include=include, error=str(ex)))
+			for id, value in namespace.items():
+				if library.__dict__.get('_u' * id.startswith('_') + id, value) is not value:
+					raise ValueError('"{id}": Duplicate identifier!'.format(id=id))
+				library[id] = value
+				library._included.add(id)
+			if library._signature is not None:
+				library._signature += tuple(x for x in files if x not in library._signature)
+	
+	def precompile(self, config):
+		'''Replace the type strings of a descriptor with parsed types. Invalid types are kept, to fail when used.'''
+		def parse(text):
+			try:
+				return self.types.parse(text)
+			except ValueError:
+				return text
+		
+		def parse_field(entry):
+			try:
+				name, fieldtype = [x.strip() for x in entry.split(':', 1)]
+			except (AttributeError, ValueError):
+				return entry
+			return [name, parse(fieldtype)]
+		
+		library = config['library']
+		defines = library.get('define', {})
+		exports = library.get('export', {})
+		
+		# Parse defined types
+		types = []
+		for id, kind, value in defines.get('type', []):
+			if kind in ('=', 'alias'):
+				value = parse(value)
+			elif kind in ('S', 'struct', 'U', 'union') and isinstance(value, list):
+				value = [parse_field(entry) for entry in value]
+			types.append([id, kind, value])
+		if types:
+			defines['type'] = types
+		
+		# Parse exported types
+		for section in ('function', 'variable'):
+			if section in exports:
+				exports[section] = [[entry[0], entry[1], parse(entry[2])] + list(entry[3:]) for entry in exports[section]]
+		return config
+	
+	def compiled_filename(self, filename):
+		'''Return the name of the compiled cache file for a descriptor'''
+		tag = getattr(getattr(sys, 'implementation', None), 'cache_tag', None) or 'python-%d%d' % sys.version_info[:2]
+		return os.path.join(os.path.dirname(filename), '__pycache__', '%s.%s.dllc' % (os.path.basename(filename), tag))
+	
+	def read_compiled(self, filename, key):
+		'''Read a compiled descriptor. Returns None if it is missing, out of date or corrupt.'''
+		try:
+			with io.open(self.compiled_filename(filename), 'rb') as file:
+				cached = marshal.loads(file.read())
+			if cached[0] == key:
+				return cached[1]
+		except Exception:
+			pass
+		return None
+	
+	def write_compiled(self, filename, key, config):
+		'''Atomically write a compiled descriptor. Failing to write the cache is not an error.'''
+		cachename = self.compiled_filename(filename)
+		try:
+			cachedir = os.path.dirname(cachename)
+			if not os.path.isdir(cachedir):
+				os.makedirs(cachedir)
+			fd, tempname = tempfile.mkstemp(dir=cachedir, prefix='.tmp-', suffix='.dllc')
+			try:
+				with io.open(fd, 'wb') as file:
+					file.write(marshal.dumps((key, config)))
+				getattr(os, 'replace', os.rename)(tempname, cachename)
+			except BaseException:
+				os.remove(tempname)
+				raise
+		except Exception:
+			pass
+	
+	def locate(self, filename, path=None, extensions=None):
+		'''
+		Locate the binary based on its name.
+		
+		When locating a binary for library, the directory of the library descriptor file is searched before any other
+		locations in the path. To simulate this, you must manually add this directory to the path when invoking this
+		function, otherwise binaries next to the descriptor file may not be found.
+		'''
+	
+		# Set up path and extensions
+		if path is None:
+			path = self.path
+		if extensions is None:
+			extensions = self.extensions
+		
+		# Check directory and extension. Both are optional.
+		hasdir = bool(os.path.dirname(filename))
+		hasext = bool(os.path.splitext(filename)[1])
+		
+		# Special suffix for files with '.' in the name to indicate the lack of an extension
+		if filename.endswith('.*'):
+			hasext = False
+			filename = filename[:-2]
+		
+		# Look up in the directory of the file, or in the path
+		if hasdir:
+			root, filename = os.path.split(os.path.abspath(filename))
+			path = [root]
+		names = [filename] if hasext else [filename + '.' + e for e in extensions]
+		
+		stats = self.locate_stats
+		stats['lookups'] += 1
+		for root in path:
+			root = os.path.abspath(root)
+			files = self.listdir(root)
+			# One stat of the directory instead of one for each name
+			stats['saved'] += len(names) - 1
+			for name in names:
+				if name in files:
+					return os.path.join(root, name)
+		
+		# Look up failed
+		return None
+		
+	def listdir(self, root):
+		'''
+		Return the names of the files in a directory, as a set.
+		
+		Listings are kept in an index, and only scanned again when the modification time of the directory changes.
+		Missing directories are indexed as empty. Directories modified in the last few seconds are not indexed, since
+		their modification time may not change on the next update.
+		'''
+		stats = self.locate_stats
+		stats['stats'] += 1
+		try:
+			stat = os.stat(root)
+			mtime = getattr(stat, 'st_mtime_ns', stat.st_mtime)
+			recent = time.time() - stat.st_mtime < self.LOCATE_RACY
+		except OSError:
+			mtime, recent = None, False
+		
+		# Look up in index
+		entry = self.locate_index.get(root)
+		if entry is not None and entry[0] == mtime:
+			return entry[1]
+		
+		# Scan directory
+		stats['scans'] += 1
+		try:
+			if hasattr(os, 'scandir'):
+				files = frozenset(x.name for x in os.scandir(root) if x.is_file())
+			else:
+				files = frozenset(x for x in os.listdir(root) if os.path.isfile(os.path.join(root, x)))
+		except OSError:
+			files = frozenset()
+		if recent:
+			self.locate_index.pop(root, None)
+		else:
+			self.locate_index[root] = (mtime, files)
+		return files
+	
+	def load_defines(self, library, defines, delayed=False):
+		# Define constants
+		for id, kind, value in defines.get('const', []):
+			self.check_unique(library, id, delayed=delayed)
+			if delayed:
+				library._delayed[id] = ('C', id, kind, value)
+			else:
+				self.define_const(library, id, kind, value)
+		
+		# Delayed types are defined on first use, together with the types they depend on
+		if delayed:
+			for id, kind, value in defines.get('type', []):
+				self.check_unique(library, id, delayed=delayed)
+				library._delayed[id] = ('T', id, kind, value)
+				if kind in ('E', 'enum'):
+					for name in self.enum_names(value):
+						self.check_unique(library, name, delayed=delayed)
+						library._delayed[name] = ('E', name, id, None)
+			return
+		
+		# Define types - First pass
+		for id, kind, value in defines.get('type', []):
+			self.check_unique(library, id)
+			if kind in ('S', 'struct', 'U', 'union'):
+				self.declare_type(library, id, kind)
+			else:
+				self.define_type(library, id, kind, value)
 		
 		# Define types - Second pass
 		for id, kind, value in defines.get('type', []):
-			if kind in ('struct', 'union') and value is not None:
+			if kind in ('S', 'struct', 'U', 'union') and value is not None:
 				self.define_type(library, id, kind, value)
 	
 	def load_exports(self, library, exports, delayed=False):
-		# Export functions
-		for id, name, type in exports.get('function', []):
+		# Export functions, with an optional dictionary of options
+		for entry in exports.get('function', []):
+			id, name, type, options = Utils.ljust(list(entry), 4)
 			self.check_unique(library, id, delayed=delayed)
 			if name is None:
 				name = id
+			options = options or {}
+			gil, params = options.get('gil', library._gil), options.get('params')
 			if delayed:
-				library._delayed[id] = ('F', id, name, type)
+				library._delayed[id] = ('F', id, name, type, gil, params)
 			else:
-				self.export_function(library, id, name, type)
+				self.export_function(library, id, name, type, gil=gil, params=params)
 		
 		# Export variables
-		for id, name, type in exports.get('variable', []):
+		for id, name, type in (x[:3] for x in exports.get('variable', [])):
 			self.check_unique(library, id, delayed=delayed)
 			if name is None:
 				name = id
@@ -599,26 +2751,57 @@ class Loader(object):
 				self.export_variable(library, id, name, type)
 	
 	def load_delayed(self, library, delayed):
-		kind, id, name, type = delayed
+		kind, id, name, type = delayed[:4]
 		if kind == 'F':
-			return self.export_function(library, id, name, type)
+			return self.export_function(library, id, name, type, *delayed[4:])
 		elif kind == 'V':
 			return self.export_variable(library, id, name, type)
+		elif kind == 'C':
+			self.define_const(library, id, name, type)
+			return library[id]
+		elif kind == 'T':
+			if name in ('S', 'struct', 'U', 'union'):
+				# Declare first, so that the fields can refer to the type itself
+				self.declare_type(library, id, name)
+				if type is not None:
+					self.define_type(library, id, name, type)
+			elif name in ('E', 'enum'):
+				# The enum defines its values too
+				values = dict((x, library._delayed.pop(x)) for x in self.enum_names(type) if x in library._delayed)
+				try:
+					self.define_type(library, id, name, type)
+				except BaseException:
+					library._delayed.update(values)
+					raise
+			else:
+				self.define_type(library, id, name, type)
+			return library[id]
+		elif kind == 'E':
+			# Enum values are defined by their enum
+			_ = library[name]
+			return library[id]
 		else:
-			raise ValueError('"{id}": Value of "kind" must be in {expected}!'.format(id=id, expected=('F', 'V')))
+			raise ValueError('"{id}": Value of "kind" must be in {expected}!'.format(id=id, expected=('F', 'V', 'C', 'T', 'E')))
 	
 	def check_unique(self, library, id, delayed=False):
 		if not self.isident(id):
 			raise ValueError('"{id}": Not a valid identifier!'.format(id=id))
+		if delayed and id in library._delayed:
+			raise ValueError('"{id}": Duplicate identifier!'.format(id=id))
 		try:
 			if delayed:
-				_ = library._delayed[id]
+				_ = library.__dict__['_u' * id.startswith('_') + id]
 			else:
 				_ = library[id]
 			raise ValueError('"{id}": Duplicate identifier!'.format(id=id))
 		except KeyError:
 			pass
 	
+	@staticmethod
+	def enum_names(entries):
+		'''Return the names of the values of an enum'''
+		return [entry.split('=', 1)[0].strip() for entry in Utils.typecheck(entries, list)]
+	
 	def define_const(self, library, id, kind, value):
 		if kind in ('I', 'int'):
 			library[id] = Utils.integer(value)
@@ -634,7 +2817,7 @@ class Loader(object):
 	def define_type(self, library, id, kind, value):
 		if kind in ('=', 'alias'):
 			try:
-				library[id] = self.types.build(self.types.parsetype(value), namespace=library)
+				library[id] = self.types.compile(value, namespace=library)
 			except ValueError as ex:
 				raise ValueError('{id}: {error}'.format(id=id, error=str(ex)))
 		
@@ -650,6 +2833,18 @@ class Loader(object):
 	def define_enum(self, library, id, entries):
 		# Check name
 		self.check_unique(library, id)
+		enumtype, values = self.enum_values(entries)
+		
+		# Define enum type
+		library[id] = enumtype
+		# Define enum values
+		for name, value in values:
+			self.check_unique(library, name)
+			library[name] = value
+	
+	@staticmethod
+	def enum_values(entries):
+		'''Return the type of an enum, and the list of its names and values'''
 		# Process entries
 		values = []
 		hi, lo, next = 0, 0, 0
@@ -667,7 +2862,7 @@ class Loader(object):
 		# Enum types are fuzzy. This is what GCC does, so we roll with it
 		if lo < 0:
 			# Signed enum
-			hi = max(hi, (- min - 1))
+			hi = max(hi, (- lo - 1))
 			if hi < 0x80000000:
 				enumtype = ctypes.c_int32
 			else:
@@ -678,80 +2873,672 @@ class Loader(object):
 				enumtype = ctypes.c_uint32
 			else:
 				enumtype = ctypes.c_uint64
-			
-		# Define enum type
-		library[id] = enumtype
-		# Define enum values
-		for name, value in values:
-			self.check_unique(library, name)
-			library[name] = value
+		return enumtype, values
 
 	def define_struct(self, library, id, entries):
 		# Check declaration
 		try:
 			cls = library[id]
-			if not issubclass(cls, ctypes.Structure) or hasattr(cls, '_fields_'):
+			if not issubclass(cls, ctypes.Structure) or '_fields_' in cls.__dict__:
 				raise ValueError('"{id}": Type is already defined'.format(id=id))
 		except KeyError:
 			cls = library[id] = type(istr(id), (ctypes.Structure,), {})
 
 		# Define fields
-		cls._fields_ = fields = []
-		for entry in Utils.typecheck(entries, list):
-			name, fieldtype = [x.strip() for x in entry.split(':', 1)]
-			try:
-				fields.append((name, self.types.build(self.types.parsetype(fieldtype), namespace=library)))
-			except ValueError as ex:
-				raise ValueError('{id}.{name}: {error}'.format(id=id, name=name, error=str(ex)))
+		self.define_fields(library, id, cls, entries)
 
 	def define_union(self, library, id, entries):
 		# Check declaration
 		try:
 			cls = library[id]
-			if not issubclass(cls, ctypes.Union) or hasattr(cls, '_fields_'):
+			if not issubclass(cls, ctypes.Union) or '_fields_' in cls.__dict__:
 				raise ValueError('"{id}": Type is already defined'.format(id=id))
 		except KeyError:
 			cls = library[id] = type(istr(id), (ctypes.Union,), {})
 		
 		# Define fields
-		cls._fields_ = fields = []
+		self.define_fields(library, id, cls, entries)
+
+	def define_fields(self, library, id, cls, entries):
+		# Entries are "name: type" strings, or [name, type] pairs in precompiled descriptors
+		fields = []
 		for entry in Utils.typecheck(entries, list):
-			name, fieldtype = [x.strip() for x in entry.split(':', 1)]
+			if isinstance(entry, list):
+				name, fieldtype = entry
+			else:
+				name, fieldtype = [x.strip() for x in entry.split(':', 1)]
 			try:
-				fields.append((name, self.types.build(self.types.parsetype(fieldtype), namespace=library)))
+				fields.append((name, self.types.compile(fieldtype, namespace=library)))
 			except ValueError as ex:
 				raise ValueError('{id}.{name}: {error}'.format(id=id, name=name, error=str(ex)))
+		cls._fields_ = fields
 
 	def declare_type(self, library, id, kind):
 		if kind in ('S', 'struct'):
 			library[id] = type(istr(id), (ctypes.Structure,), {})
-		elif kindin ('U', 'union'):
+		elif kind in ('U', 'union'):
 			library[id] = type(istr(id), (ctypes.Union,), {})
 		else:
 			raise ValueError('"{id}": Value of "kind" must be in {expected}'.format(id=id, expected=("S", "struct", "U", "union")))
 
-	def export_function(self, library, id, name, type):
+	def export_function(self, library, id, name, type, gil=None, params=None):
 		try:
-			type = self.types.build(self.types.parsetype(type), namespace=library)
+			type = self.types.compile(type, namespace=library)
 		except ValueError as ex:
 			raise ValueError('{id}: {error}'.format(id=id, error=str(ex)))
+		result = library[id] = self.bind_function(library, id, name, type, gil=gil, params=params)
+		return result
+	
+	def bind_function(self, library, id, name, type, gil=None, params=None):
+		'''
+		Create the function object of an export from its function type. Also used by generated modules.
+		
+		The "gil" policy is "release" (the default) to release the GIL during calls, or "hold" to keep it, which is
+		faster for functions that return quickly, but blocks the other threads. It is saved as the "gil" attribute of
+		the result. The "params" option declares out parameters, see "bind_params".
+		'''
+		gil = gil or 'release'
+		if gil not in ('release', 'hold'):
+			raise ValueError('"{id}": Value of "gil" must be in {expected}'.format(id=id, expected=('release', 'hold')))
+		type = self.types.build_gil(type, hold=gil == 'hold')
 		result = ctypes.cast(getattr(library._binary, name), type)
-		library[id] = result
+		
+		# Accept buffers for pointer and array parameters, and reuse the trampolines of callbacks
+		argtypes = result.argtypes
+		if argtypes:
+			callbacks = getattr(library, '_callbacks', None)
+			converted = tuple(callbacks.param(x) if callbacks is not None and ctypes._CFuncPtr in getattr(x, '__mro__', ()) else self.types.build_param(x, readonly=self.readonly_buffers) for x in argtypes)
+			if converted != tuple(argtypes):
+				result.argtypes = converted
+		
+		if params:
+			result = self.bind_params(library, id, name, result, params)
+		elif self.instrument:
+			result = self.instrument_function(library, id, result)
+		result.gil = gil
 		return result
+	
+	# Parameter modes of "bind_params": mode, and the number of elements or the index of the parameter that holds it
+	PARAM_PATTERN = re.compile(r'^\s*(in|out|inout)\s*(?:\[\s*(?:(\d+)|\$(\d+))\s*\])?\s*$')
+	
+	def bind_params(self, library, id, name, function, params):
+		'''
+		Bind an exported function, so that storage for its out parameters is allocated for each call, and their values
+		are returned, instead of passed by the caller.
+		
+		"params" maps the index of pointer parameters to their mode: "in", "out" or "inout", optionally followed by
+		the number of elements in brackets, which is a number, or "$" and the index of the parameter that holds it.
+		Out parameters are left out of the arguments, inout parameters take their initial value from the argument. The
+		result is a tuple of the return value (unless it is void), and the values of the out and inout parameters in
+		order. Structures are returned as they are, arrays of simple values as lists (or bytes).
+		
+		When all of them are single simple values, the out parameters are left to ctypes ("paramflags"), otherwise a
+		wrapper converts them, with the arrays of simple values taken from the buffer pool.
+		'''
+		argtypes, restype = function.argtypes or (), function.restype
+		count = len(argtypes)
+		plan = []
+		for key, spec in sorted(((int(key), spec) for key, spec in params.items())):
+			match = self.PARAM_PATTERN.match(spec) if isinstance(spec, (str, istr)) else None
+			if match is None:
+				raise ValueError('"{id}": Invalid parameter mode: {spec}'.format(id=id, spec=spec))
+			mode, fixed, ref = match.group(1), match.group(2), match.group(3)
+			if not 0 <= key < count or ref is not None and not 0 <= int(ref) < count:
+				raise ValueError('"{id}": Parameter index out of range: {index}: {spec}'.format(id=id, index=key, spec=spec))
+			if mode == 'in':
+				continue
+			if not issubclass(argtypes[key], ctypes._Pointer):
+				raise ValueError('"{id}": Parameter {index} is not a pointer'.format(id=id, index=key))
+			element = argtypes[key]._type_
+			plan.append((key, mode == 'inout', element, issubclass(element, ctypes._SimpleCData), fixed and int(fixed), ref and int(ref)))
+		if not plan:
+			return self.instrument_function(library, id, function) if self.instrument else function
+		
+		outs = set(x[0] for x in plan if not x[1])
+		void = restype is None
+		
+		if not self.instrument and all(simple and not inout and fixed is None and ref is None for _, inout, _, simple, fixed, ref in plan):
+			# Storage allocated by ctypes, the out parameters keep their plain pointer types
+			prototype = type(function)
+			argtypes = tuple(prototype._argtypes_[index] if index in outs else argtype for index, argtype in enumerate(argtypes))
+			prototype = type(istr(id), (ctypes._CFuncPtr,), {'_argtypes_': argtypes, '_restype_': restype, '_flags_': prototype._flags_})
+			result = prototype((name, library._binary), tuple((2 if index in outs else 1,) for index in range(count)))
+			indexes = sorted(outs)
+			def errcheck(value, function, args):
+				values = [args[index].value for index in indexes]
+				if not void:
+					values.insert(0, value)
+				return tuple(values)
+			result.errcheck = errcheck
+			return result
+		
+		if self.instrument:
+			function = self.instrument_function(library, id, function)
+		visible = [index for index in range(count) if index not in outs]
+		pool = self.pool
+		
+		def call(*args):
+			if len(args) != len(visible):
+				raise TypeError('{id}() takes {count} arguments ({given} given)'.format(id=id, count=len(visible), given=len(args)))
+			full = [None] * count
+			for index, value in zip(visible, args):
+				full[index] = value
+			
+			buffers = []
+			for index, inout, element, simple, fixed, ref in plan:
+				size = fixed if ref is None else int(full[ref])
+				if size is None:
+					buffer = element()
+				elif simple:
+					buffer = pool.take(element, size)
+				else:
+					buffer = (element * size)()
+				if inout:
+					if size is None and simple:
+						buffer.value = full[index]
+					elif size is None:
+						ctypes.pointer(buffer)[0] = full[index]
+					else:
+						value = full[index][:size]
+						buffer[:len(value)] = value
+						if simple and not pool.clear and len(value) < size:
+							ctypes.memset(ctypes.byref(buffer, len(value) * ctypes.sizeof(element)), 0, (size - len(value)) * ctypes.sizeof(element))
+				elif simple and size and not pool.clear:
+					# Pooled buffers hold the values of earlier calls
+					ctypes.memset(buffer, 0, size * ctypes.sizeof(element))
+				full[index] = buffer
+				buffers.append((buffer, simple, size))
+			
+			result = function(*full)
+			
+			# Copy the values of pooled buffers
+			values = [] if void else [result]
+			for buffer, simple, size in buffers:
+				if not simple:
+					values.append(buffer)
+				elif size is None:
+					values.append(buffer.value)
+				else:
+					values.append(buffer[:size])
+					pool.release(buffer)
+			return tuple(values)
+		
+		call.__name__ = istr(id)
+		call.__wrapped__ = function
+		return call
+	
+	def instrument_function(self, library, id, function):
+		'''
+		Wrap an exported function to record its calls in "stats".
+		
+		The wrapper converts the arguments itself, so that conversion can be timed separately, and then calls the
+		function without the argument checks of ctypes. The original function is available as "__wrapped__".
+		'''
+		key = (os.path.splitext(os.path.basename(getattr(library, '_filename', '')))[0], id)
+		record = self.stats.record
+		callsites = self.instrument == 'callsites'
+		clock = Utils.clock
+		
+		# Vararg functions are not converted
+		argtypes = function.argtypes
+		if argtypes is None:
+			converters, unchecked = (), function
+		else:
+			converters = tuple(Utils.converter(argtype) for argtype in argtypes)
+			unchecked = ctypes.cast(function, type(function))
+			unchecked.argtypes = None
+			unchecked.restype = function.restype
+		count = len(converters)
+		
+		def call(*args):
+			start = clock()
+			if converters:
+				if len(args) != count:
+					raise TypeError('this function takes {count} arguments ({given} given)'.format(count=count, given=len(args)))
+				args = [convert(arg, index) for index, (convert, arg) in enumerate(zip(converters, args))]
+			converted = clock()
+			result = unchecked(*args)
+			end = clock()
+			if callsites:
+				frame = sys._getframe(1)
+				record(key, end - start, converted - start, (frame.f_code.co_filename, frame.f_lineno))
+			else:
+				record(key, end - start, converted - start)
+			return result
+		
+		call.__name__ = istr(id)
+		call.__wrapped__ = function
+		return call
 
 	def export_variable(self, library, id, name, type):
 		try:
-			type = self.types.build(self.types.parsetype(type), namespace=library)
+			type = self.types.compile(type, namespace=library)
 		except ValueError as ex:
 			raise ValueError('{id}: {error}'.format(id=id, error=str(ex)))
 		result = type.in_dll(library._binary, name)
 		library[id] = result
 		return result
 	
+	def dtype(self, library, type):
+		'''
+		Return the NumPy dtype of a ctypes type, or of a type string compiled in the namespace of the library. The
+		dtypes of enums defined by the library have their values in the "enum" key of their metadata.
+		'''
+		if not isinstance(type, (str, istr)):
+			return self.types.build_dtype(type)
+		result = self.types.build_dtype(self.types.compile(type, namespace=library))
+		
+		# Enums are plain integer types, the values are only known by the descriptor
+		for entry in library._config.get('define', {}).get('type', []):
+			if entry[0] == type and entry[1] in ('E', 'enum'):
+				import numpy
+				result = numpy.dtype(result, metadata={'enum': dict(self.enum_values(entry[2])[1])})
+		return result
+	
+	def ndarray(self, library, source, count=None, element=None):
+		'''
+		Wrap the memory of a ctypes object as a NumPy array, without copying.
+		
+		The source is a ctypes array or instance (for example an exported variable), or a pointer with the number of
+		elements it points to (for example a result). Void pointers and addresses also need the element type, which
+		can be a type string of the library. The array keeps the source alive, and writes go to the same memory.
+		'''
+		import numpy
+		if isinstance(element, (str, istr)):
+			element = self.types.compile(element, namespace=library)
+		
+		# Pointers need a count to know the extent of the memory
+		if isinstance(source, (ctypes._Pointer, ctypes.c_void_p)) or isinstance(source, int) and not isinstance(source, bool):
+			if count is None:
+				raise ValueError('The count is required for pointers')
+			if element is None:
+				if not isinstance(source, ctypes._Pointer):
+					raise ValueError('The element type is required for void pointers')
+				element = source._type_
+			address = source if isinstance(source, int) else ctypes.cast(source, ctypes.c_void_p).value
+			if not address and count:
+				raise ValueError('Null pointer')
+			pointer, source = source, (element * count).from_address(address) if count else (element * 0)()
+			# Pointers into ctypes objects keep them alive
+			source._pointer = pointer
+		elif element is None:
+			element = source._type_ if isinstance(source, ctypes.Array) else type(source)
+		
+		# Arrays have one row for each element, other objects are a single element
+		dtype = self.types.build_dtype(element)
+		memory = memoryview(source).cast('B') if ctypes.sizeof(source) else b''
+		result = numpy.frombuffer(memory, dtype=dtype, count=count if count is not None else -1)
+		if not isinstance(source, ctypes.Array) and count is None:
+			result = result.reshape(dtype.shape)
+		return result
+	
+	def alloc(self, library, type, count=None, align=None):
+		'''
+		Allocate an instance of a type, or an array of "count" elements of it, at an address that is a multiple of
+		"align" bytes (a power of two). The type is a ctypes type, or a type string of the library. The memory is
+		zeroed, and the result is a plain ctypes object: pointer and array parameters take it without copying. For
+		reusable aligned buffers, pass the alignment to the buffer pool instead. See BufferPool.
+		'''
+		return self.types.alloc(type, count=count, align=align, namespace=library)
+	
+	def batch(self, library, name, columns, out=None, stride=None):
+		'''
+		Call an exported function once for each row of a set of columns.
+		
+		Columns are buffers (array.array, memoryview, ctypes arrays and so on) with one element for each call, or
+		scalars that are passed to every call. Pointer and array parameters take a buffer as a whole, and pass the same
+		pointer to every call. When "stride" is given, their buffers are record columns instead: each call gets a
+		pointer to the next record of "stride" bytes. The columns are checked and converted for the whole batch at
+		once, and the function is called without the per call argument checks of ctypes. The results are written into
+		"out" when given, otherwise into a new ctypes array. Returns the results.
+		'''
+		function = library[name]
+		function = getattr(function, '__wrapped__', function)
+		argtypes = function.argtypes
+		if argtypes is None:
+			raise TypeError('"{name}": Vararg functions can not be called in batches'.format(name=name))
+		if len(columns) != len(argtypes):
+			raise TypeError('"{name}": Expected {expected} columns, got {count}'.format(name=name, expected=len(argtypes), count=len(columns)))
+		if stride is not None and stride <= 0:
+			raise ValueError('"{name}": The stride must be positive'.format(name=name))
+		
+		# Check and convert columns, the values of buffers with the other byte order would be swapped
+		count, args, records = None, [], []
+		foreign = '>!' if sys.byteorder == 'little' else '<'
+		for index, (column, argtype) in enumerate(zip(columns, argtypes)):
+			if issubclass(argtype, (ctypes._Pointer, ctypes.c_void_p)):
+				# Record columns need the number of rows, pointers and other buffers are converted once, and repeated
+				if stride is not None and not isinstance(column, (ctypes._Pointer, ctypes.c_void_p)) and Utils.isbuffer(column):
+					records.append(index)
+					args.append(None)
+				else:
+					args.append(itertools.repeat(argtype.from_param(column)))
+				continue
+			try:
+				view = memoryview(column)
+			except TypeError:
+				# Scalars are converted once, and repeated
+				if not isinstance(column, argtype):
+					column = argtype(column) if Utils.typekind(argtype) else argtype.from_param(column)
+				args.append(itertools.repeat(column))
+				continue
+			kind = Utils.typekind(argtype)
+			if kind is None or view.ndim != 1 or view.format[:1] in foreign or Utils.formatkind(view.format, view.itemsize) != kind:
+				raise TypeError('"{name}": Column {index} does not match parameter type {type}'.format(name=name, index=index, type=argtype.__name__))
+			if count is not None and len(view) != count:
+				raise ValueError('"{name}": Column {index} has {length} rows, expected {count}'.format(name=name, index=index, length=len(view), count=count))
+			count = len(view)
+			if not hasattr(view, 'cast'):
+				# Memoryviews iterate bytes on python 2
+				view = (argtype * count).from_buffer_copy(view.tobytes())
+			elif view.format != argtype._type_:
+				# Columns of ctypes arrays have formats with a byte order, like "<i", that memoryviews do not iterate
+				view = view.cast('B').cast(argtype._type_)
+			args.append(imap(argtype, view))
+		
+		# Record columns point into their buffer, which is checked and kept alive as a whole
+		buffers = []
+		for index in records:
+			nbytes = memoryview(columns[index]).nbytes
+			if count is None:
+				count = nbytes // stride
+			if nbytes < count * stride:
+				raise ValueError('"{name}": Column {index} has {length} records of {stride} bytes, expected {count}'.format(name=name, index=index, length=nbytes // stride, stride=stride, count=count))
+			buffers.append(argtypes[index].from_param(columns[index]))
+			address = ctypes.cast(buffers[-1], ctypes.c_void_p).value
+			args[index] = imap(ctypes.c_void_p, range(address, address + count * stride, stride))
+		if count is None:
+			raise ValueError('"{name}": At least one column must be a buffer, or a record column with a stride'.format(name=name))
+		
+		# Arguments are already converted, so the function can be called through a type without parameter types
+		restype, functype = function.restype, type(function)
+		unchecked = ctypes.cast(function, type(functype.__name__, (ctypes._CFuncPtr,), {'_restype_': restype, '_flags_': functype._flags_}))
+		results = imap(unchecked, *args)
+		if restype is None:
+			collections.deque(results, maxlen=0)
+			return None
+		
+		# Store results
+		if out is None:
+			out = target = (restype * count)()
+		else:
+			view, kind = memoryview(out), Utils.typekind(restype)
+			if kind is None or view.ndim != 1 or Utils.formatkind(view.format, view.itemsize) != kind or len(view) < count:
+				raise TypeError('"{name}": Output buffer does not match result type {type}[{count}]'.format(name=name, type=restype.__name__, count=count))
+			target = (restype * count).from_buffer(out)
+		
+		# Results are stored in chunks, to keep the temporary lists small
+		for lo in range(0, count, self.BATCH_CHUNK):
+			hi = min(lo + self.BATCH_CHUNK, count)
+			target[lo:hi] = list(itertools.islice(results, hi - lo))
+		return out
+	
 	@staticmethod
 	def isident(name):
 		return Types.isident(name)
 
+class Generator(object):
+
+	'''
+		Generator class - Static binding modules
+		
+		Turns a library descriptor into the source code of a python module, that defines the same names as the library
+		returned by the loader. Types are written as literal ctypes code, so importing the module does not read or
+		parse the descriptor. Exported functions and variables are resolved on first use (on python 3.7 and newer), and
+		are created by the default loader at runtime, so they behave the same way as in loaded libraries. Names that are
+		python keywords get a trailing underscore.
+	'''
+	
+	TEMPLATE = (
+		'# Generated from "{filename}" by dll.generate, do not edit\n'
+		'{docstring}\n'
+		'{code}'
+	)
+	
+	# Names defined by the library object, besides the definitions and exports
+	RESERVED = ('version', 'description')
+	
+	# Names that can not be assigned in python 2 or 3, which get a trailing underscore
+	KEYWORDS = frozenset(keyword.kwlist) | frozenset(('async', 'await', 'exec', 'nonlocal', 'print', 'None', 'True', 'False'))
+	
+	def __init__(self, loader):
+		self.loader = loader
+	
+	def generate(self, filename, language='python', template=None):
+		'''Generate the source code of a binding module for a descriptor'''
+		if language != 'python':
+			raise ValueError('Value of "language" must be in {expected}!'.format(expected=('python',)))
+		filename = os.path.abspath(filename)
+		config = self.loader.read(filename)
+		library = config['library']
+		defines, exports = library.get('define', {}), library.get('export', {})
+		
+		# Collect names, the definitions of included fragments are taken from the type pool when the module is imported
+		names = set(self.RESERVED)
+		includes = [os.path.join(os.path.dirname(filename), x) for x in library.get('include', [])]
+		included = [(x, list(self.loader.type_pool.fragment(self.loader, x))) for x in includes]
+		types = collections.OrderedDict((id, (id, 'include', None)) for _, ids in included for id in ids)
+		types.update((entry[0], entry) for entry in defines.get('type', []))
+		for id in itertools.chain(collections.OrderedDict.fromkeys(id for _, ids in included for id in ids), (x[0] for x in defines.get('const', [])), (x[0] for x in defines.get('type', [])), (x[0] for x in exports.get('function', [])), (x[0] for x in exports.get('variable', []))):
+			self.check_unique(names, id)
+		
+		lines = [
+			'import sys as _sys',
+			'import ctypes as _ctypes',
+			'import dll as _dll',
+			'',
+			'_loader = _dll.default_loader',
+			'_types = _loader.types',
+			'_filename = {0!r}'.format(filename),
+			'_binary = _loader.open_binary(_filename, {0!r})'.format(dict((k, v) for k, v in config.items() if k in ('binary', 'mode'))),
+			'version = _version = {0!r}'.format(library['version']),
+			'description = _description = {0!r}'.format(library['description']),
+		]
+		if config.get('check_symbols', self.loader.check_symbols):
+			symbols = dict((x, [[istr(entry[0]), istr(entry[1] or entry[0])] for entry in exports.get(x, [])]) for x in ('function', 'variable'))
+			lines.append('_loader.check_exports(_filename, _binary, {0!r})'.format({'export': symbols}))
+		for path, ids in included:
+			lines.append('_fragment = _loader.type_pool.fragment(_loader, {0!r})'.format(os.path.abspath(path)))
+			lines.extend('{0} = _fragment[{1!r}]'.format(self.attrname(id), istr(id)) for id in ids)
+		
+		# Constants
+		if defines.get('const'):
+			lines.append('')
+			values = {}
+			for id, kind, value in defines['const']:
+				self.loader.define_const(values, id, kind, value)
+				lines.append('{0} = {1!r}'.format(self.attrname(id), values[id]))
+		
+		# Structures and unions are declared first, so that anything can refer to them
+		declared = [entry for entry in types.values() if entry[1] in ('S', 'struct', 'U', 'union')]
+		for id, kind, value in declared:
+			base = 'Structure' if kind in ('S', 'struct') else 'Union'
+			lines.extend(['', '', 'class {0}(_ctypes.{1}):'.format(self.attrname(id), base), '\tpass'])
+			if self.attrname(id) != id:
+				lines.append('{0}.__name__ = {1!r}'.format(self.attrname(id), istr(id)))
+		if declared:
+			lines.append('')
+		
+		# Other definitions follow the types they use
+		lines.append('')
+		for id in self.order(types):
+			id, kind, value = types[id]
+			name = self.attrname(id)
+			if kind == 'include':
+				continue
+			elif kind in ('=', 'alias'):
+				lines.append('{0} = {1}'.format(name, self.render(value, types, id)))
+			elif kind in ('E', 'enum'):
+				enumtype, values = self.loader.enum_values(value)
+				lines.append('{0} = {1}'.format(name, self.render_builtin(enumtype)))
+				for member, number in values:
+					self.check_unique(names, member)
+					lines.append('{0} = {1!r}'.format(self.attrname(member), number))
+			elif kind in ('S', 'struct', 'U', 'union'):
+				if value is not None:
+					fields = []
+					for entry in Utils.typecheck(value, list):
+						field, fieldtype = entry if isinstance(entry, list) else [x.strip() for x in entry.split(':', 1)]
+						fields.append('\t({0!r}, {1}),'.format(istr(field), self.render(fieldtype, types, '{0}.{1}'.format(id, field))))
+					lines.extend(['{0}._fields_ = ['.format(name)] + fields + [']'])
+			else:
+				raise ValueError('"{id}": Value of "kind" must be in {expected}'.format(id=id, expected=("=", "alias", "E", "enum", "S", "struct", "U", "union")))
+		
+		# Exports are resolved on first use
+		lines.extend(['', '_exports = {'])
+		for section, kind in (('function', 'F'), ('variable', 'V')):
+			for entry in exports.get(section, []):
+				id, name, type, options = Utils.ljust(list(entry), 4)
+				options = options or {}
+				gil = options.get('gil', library.get('gil', 'release')) if kind == 'F' else None
+				params = options.get('params') if kind == 'F' else None
+				lines.append('\t{0!r}: ({1!r}, {2!r}, {3!r}, lambda: {4}, {5!r}, {6!r}),'.format(self.attrname(id), kind, istr(id), istr(name or id), self.render(type, types, id), gil, params))
+		lines.extend(['}', '', self.RESOLVE])
+		
+		docstring = repr(library['description'])
+		return (template or self.TEMPLATE).format(filename=os.path.basename(filename), docstring=docstring, code='\n'.join(lines) + '\n')
+	
+	# Resolves exports, the same way the loader does
+	RESOLVE = (
+		"def __getattr__(name):\n"
+		"\ttry:\n"
+		"\t\tkind, id, symbol, prototype, gil, params = _exports[name]\n"
+		"\texcept KeyError:\n"
+		"\t\traise AttributeError('module {0!r} has no attribute {1!r}'.format(__name__, name))\n"
+		"\tif kind == 'F':\n"
+		"\t\tresult = _loader.bind_function(_sys.modules[__name__], id, symbol, prototype(), gil=gil, params=params)\n"
+		"\telse:\n"
+		"\t\tresult = prototype().in_dll(_binary, symbol)\n"
+		"\tglobals()[name] = result\n"
+		"\treturn result\n"
+		"\n"
+		"# Modules can not resolve names on first use before python 3.7\n"
+		"if _sys.version_info < (3, 7):\n"
+		"\tfor _name in list(_exports):\n"
+		"\t\tglobals()[_name] = __getattr__(_name)\n"
+	)
+	
+	def check_unique(self, names, id):
+		if not self.loader.isident(id):
+			raise ValueError('"{id}": Not a valid identifier!'.format(id=id))
+		if self.attrname(id) in names:
+			raise ValueError('"{id}": Duplicate identifier!'.format(id=id))
+		names.add(self.attrname(id))
+	
+	@staticmethod
+	def attrname(id):
+		'''Escape names starting with underscore, the same way libraries do, and python keywords'''
+		if id in Generator.KEYWORDS:
+			return id + '_'
+		return '_u' * id.startswith('_') + id
+	
+	def order(self, types):
+		'''
+		Return the names of the defined types in the order they have to be defined. Types come after the types they
+		use, except through pointers to structures and unions, which are declared in advance.
+		'''
+		result, done = [], set()
+		
+		def visit(id, active):
+			if id in done or id in active:
+				return
+			active.add(id)
+			for ref in self.dependencies(types[id], types):
+				visit(ref, active)
+			active.discard(id)
+			done.add(id)
+			result.append(id)
+		
+		for id in types:
+			visit(id, set())
+		return result
+	
+	def dependencies(self, entry, types):
+		'''Return the defined types an entry needs to be complete'''
+		id, kind, value = entry
+		if kind in ('=', 'alias'):
+			nodes = [value]
+		elif kind in ('S', 'struct', 'U', 'union') and value is not None:
+			nodes = [x[1] if isinstance(x, list) else x.split(':', 1)[-1] for x in value]
+		else:
+			return []
+		
+		result = []
+		stack = [self.parse(x) for x in nodes]
+		while stack:
+			node = stack.pop()
+			if not isinstance(node, tuple) or not node:
+				continue
+			if node[0] == 'id':
+				if node[1] in types:
+					result.append(node[1])
+			elif node[0] == '*' and isinstance(node[1], tuple) and node[1][0] == 'id' and node[1][1] in types and types[node[1][1]][1] in ('S', 'struct', 'U', 'union'):
+				continue
+			elif isinstance(node[0], tuple):
+				stack.extend(node)
+			else:
+				stack.extend(node[1:])
+		return result
+	
+	def parse(self, type):
+		return type if isinstance(type, tuple) else self.loader.types.parse(type)
+	
+	def render(self, type, types, id):
+		'''Return the python expression of a type'''
+		try:
+			return self._render(self.parse(type), types)
+		except ValueError as ex:
+			raise ValueError('{id}: {error}'.format(id=id, error=str(ex)))
+	
+	def _render(self, type, types):
+		if type == '()':
+			return 'None'
+		elif type == '...':
+			return "'...'"
+		op, nodes = type[0], type[1:]
+		if op == '*':
+			return '_ctypes.POINTER({0})'.format(self._render(nodes[0], types))
+		elif op == '[]':
+			return '({0} * {1})'.format(self._render(nodes[0], types), int(nodes[1] or 0))
+		elif op == '->':
+			params = [self._render(x, types) for x in nodes[0]]
+			result = self._render(nodes[1], types)
+			calltype = nodes[2] or 'cdecl'
+			if "'...'" in params or calltype not in ('cdecl', 'stdcall'):
+				# Vararg functions, and invalid calltypes fail the same way as in loaded libraries
+				return '_types.build_function(({0},), {1}, {2!r})'.format(', '.join(params), result, nodes[2])
+			factory = 'CFUNCTYPE' if calltype == 'cdecl' else 'WINFUNCTYPE'
+			return '_ctypes.{0}({1})'.format(factory, ', '.join([result] + params))
+		elif op == 'id':
+			if nodes[0] in types:
+				return self.attrname(nodes[0])
+			try:
+				return self.render_builtin(self.loader.types[nodes[0]], nodes[0])
+			except KeyError:
+				raise Utils.dontchain(ValueError('Undefined type: %s' % nodes[0]))
+		else:
+			raise ValueError('Invalid operator: %s' % op)
+	
+	@staticmethod
+	def render_builtin(value, name=None):
+		'''
+		Return the python expression of a built in type. C types are written by their name, other integer types by
+		their size, and the types whose size depends on the platform by the type they have the size of.
+		'''
+		if value is None:
+			return 'None'
+		if name in Types.PLATFORM:
+			return '{{4: _ctypes.c_{0}int32, 8: _ctypes.c_{0}int64}}[_ctypes.sizeof(_ctypes.{1})]'.format('' if value._type_.islower() else 'u', Types.PLATFORM[name])
+		if name is not None and getattr(ctypes, 'c_' + name, None) is value:
+			return '_ctypes.c_' + name
+		if issubclass(value, ctypes._SimpleCData) and value._type_ in 'bBhHiIlLqQ':
+			return '_ctypes.c_{0}int{1}'.format('' if value._type_.islower() else 'u', 8 * ctypes.sizeof(value))
+		if getattr(ctypes, value.__name__, None) is value:
+			return '_ctypes.' + value.__name__
+		if name is None:
+			raise ValueError('Type can not be written: %r' % value)
+		return '_types[{0!r}]'.format(name)
+
 # Default loader used by the `load` function 
 default_loader = Loader()
 
@@ -759,8 +3546,17 @@ def load(filename, binary=None, private=False):
 	'''Load a dynamic library definition file, using the default loader.'''
 	return default_loader.load(filename, binary=binary, private=private)
 
+def load_many(filenames, private=False, workers=4):
+	'''Load multiple dynamic library definition files in parallel, using the default loader.'''
+	return default_loader.load_many(filenames, private=private, workers=workers)
+
+def reload(filename, binary=None):
+	'''Reload a dynamic library definition file if it changed, using the default loader.'''
+	return default_loader.reload(filename, binary=binary)
+
 def generate(filename, language='python', template=None):
-	raise NotImplementedError
+	'''Generate the source code of a python module from a dynamic library definition file, using the default loader.'''
+	return Generator(default_loader).generate(filename, language=language, template=template)
 	
 class Utils(object):
 
@@ -777,6 +3573,22 @@ class Utils(object):
 			raise TypeError('Expected value to have type: %r' % types)
 		return value
 	
+	@staticmethod
+	def missing_symbols(binary, names, cache=[]):
+		'''Return the names that are not found in a binary, looked up with dlsym where it is available'''
+		if not cache:
+			try:
+				lookup = ctypes.CDLL(None).dlsym
+				lookup.restype = ctypes.c_void_p
+				lookup.argtypes = (ctypes.c_void_p, ctypes.c_char_p)
+			except (AttributeError, OSError, TypeError):
+				lookup = None
+			cache.append(lookup)
+		lookup = cache[0]
+		if lookup is None:
+			return [name for name in names if not hasattr(binary, name)]
+		return [name for name in names if not lookup(binary._handle, Utils.bytes(name))]
+	
 	@staticmethod
 	def bytes(val):
 		'''Convert to byte string'''
@@ -827,6 +3639,190 @@ class Utils(object):
 		# Fallback
 		return int(val)
 		
+	# Kinds of the single character type codes used by ctypes, array and struct
+	KINDS = {
+		'b': 'i', 'h': 'i', 'i': 'i', 'l': 'i', 'q': 'i', 'n': 'i',
+		'B': 'u', 'H': 'u', 'I': 'u', 'L': 'u', 'Q': 'u', 'N': 'u', 'P': 'u',
+		'f': 'f', 'd': 'f', 'g': 'f',
+		'c': 'c', 'u': 'w', '?': '?',
+	}
+	
+	@staticmethod
+	def typeids(types):
+		'''Return the names of the types referred to by parsed types'''
+		stack = list(types)
+		while stack:
+			node = stack.pop()
+			if isinstance(node, tuple) and node:
+				if node[0] == 'id':
+					yield node[1]
+				elif isinstance(node[0], tuple):
+					stack.extend(node)
+				else:
+					stack.extend(node[1:])
+	
+	@staticmethod
+	def formatkind(format, size):
+		'''Return the kind and size of a buffer format, or None if it is not a simple type'''
+		kind = Utils.KINDS.get(format.lstrip('@=<>!'))
+		return kind and (kind, size)
+	
+	@staticmethod
+	def fields(type):
+		'''
+		Return the fields of a structure or union, after the fields of its base classes. They are read from the class
+		dictionaries: on CPython 3.8 to 3.12, looking up "_fields_" of a union before it is set can hide it afterwards.
+		'''
+		result = []
+		for cls in reversed(type.__mro__):
+			result.extend(cls.__dict__.get('_fields_', ()))
+		return result
+	
+	@staticmethod
+	def isbuffer(value):
+		'''Return whether a value supports the buffer protocol'''
+		try:
+			memoryview(value)
+		except TypeError:
+			return False
+		return True
+	
+	@staticmethod
+	def typekind(type):
+		'''Return the kind and size of a simple ctypes type, or None if it is not a simple type'''
+		code = getattr(type, '_type_', None)
+		kind = Utils.KINDS.get(code) if isinstance(code, istr) else None
+		return kind and (kind, ctypes.sizeof(type))
+		
+	# Clock used to time calls
+	clock = staticmethod(getattr(time, 'perf_counter', time.time))
+	
+	@staticmethod
+	def converter(argtype):
+		'''
+		Create a function that converts a value to an argument for "argtype", in a form that can be passed to a
+		function without argument types (Instances of the type, or references). Errors raise ctypes.ArgumentError.
+		'''
+		simple = issubclass(argtype, ctypes._SimpleCData)
+		def convert(value, index):
+			if isinstance(value, argtype):
+				return value
+			try:
+				if simple:
+					try:
+						return argtype(value)
+					except TypeError:
+						pass
+				result = argtype.from_param(value)
+				if not simple or isinstance(result, ctypes._SimpleCData.__base__):
+					return result
+				
+				# Simple types convert strings to parameter objects, that only work with argument types
+				if isinstance(value, bytes):
+					return ctypes.c_char_p(value)
+				if isinstance(value, str):
+					return ctypes.c_wchar_p(value)
+				return argtype(value)
+			except Exception as ex:
+				raise Utils.dontchain(ctypes.ArgumentError('argument {index}: {type}: {error}'.format(index=index + 1, type=type(ex).__name__, error=ex)))
+		return convert
+	
+	# Types that are known to support the buffer protocol
+	BUFFERS = (bytearray, memoryview, array.array, mmap.mmap)
+	
+	# ctypes types of the typecodes of arrays
+	TYPECODES = dict((x._type_, x) for x in (
+		ctypes.c_char, ctypes.c_wchar, ctypes.c_byte, ctypes.c_ubyte, ctypes.c_short, ctypes.c_ushort, ctypes.c_int,
+		ctypes.c_uint, ctypes.c_long, ctypes.c_ulong, ctypes.c_longlong, ctypes.c_ulonglong, ctypes.c_float, ctypes.c_double,
+	))
+	
+	class Py_buffer(ctypes.Structure):
+		'''Buffer view structure of the Python C API (with room for the private fields of older versions)'''
+		_fields_ = [
+			('buf', ctypes.c_void_p), ('obj', ctypes.c_void_p), ('len', ctypes.c_ssize_t), ('itemsize', ctypes.c_ssize_t),
+			('readonly', ctypes.c_int), ('ndim', ctypes.c_int), ('format', ctypes.c_char_p), ('shape', ctypes.c_void_p),
+			('strides', ctypes.c_void_p), ('suboffsets', ctypes.c_void_p), ('reserved', ctypes.c_void_p * 4),
+		]
+	
+	@staticmethod
+	def bufferpointer(pointer, view, element, length, readonly=False):
+		'''Create a pointer to the memory of a buffer, after checking it against the element type and length'''
+		if not getattr(view, 'contiguous', True):
+			raise TypeError('Buffer is not contiguous')
+		if view.readonly and not readonly:
+			raise TypeError('Read-only buffer passed for a non-const pointer')
+		
+		# Check element type and size. Byte buffers are accepted for any element type.
+		nbytes = getattr(view, 'nbytes', len(view) * view.itemsize)
+		if element is not None:
+			size = ctypes.sizeof(element)
+			kind = Utils.formatkind(view.format, view.itemsize)
+			if kind in (('u', 1), ('i', 1), ('c', 1)):
+				if nbytes % size:
+					raise TypeError('Buffer size {nbytes} is not a multiple of {type} size {size}'.format(nbytes=nbytes, type=element.__name__, size=size))
+			elif view.itemsize != size or kind != (Utils.typekind(element) or kind):
+				raise TypeError('Buffer format "{format}" does not match {type}'.format(format=view.format, type=element.__name__))
+			if nbytes < length * size:
+				raise ValueError('Buffer size {nbytes} is less than {type}[{length}]'.format(nbytes=nbytes, type=element.__name__, length=length))
+		
+		# Writable buffers are mapped as arrays of the element type, which pointer parameters accept as they are, and
+		# which keep the buffer alive. Read-only buffers are kept alive by hand, and so are memoryviews on python 2,
+		# where "from_buffer" only maps objects with the old buffer interface.
+		if not view.readonly:
+			try:
+				if element is None:
+					return (ctypes.c_char * nbytes).from_buffer(view)
+				return (element * (nbytes // size)).from_buffer(view)
+			except TypeError:
+				pass
+		result = ctypes.cast(Utils.bufferaddress(view), pointer)
+		result._buffer = view
+		return result
+	
+	@staticmethod
+	def aligned(type, count=None, align=None):
+		'''
+		Return a new instance of "type", or an array of "count" elements of it, at an address that is a multiple of
+		"align" bytes (a power of two). The memory is zeroed, and kept alive by the result.
+		'''
+		if count is not None:
+			type = type * int(count)
+		if align is None:
+			return type()
+		if not isinstance(align, int) or align <= 0 or align & (align - 1):
+			raise ValueError('align: Expected a power of two, got {align!r}'.format(align=align))
+		if align <= ctypes.alignment(type):
+			return type()
+		
+		# Over-allocate raw memory, and map the instance at the first aligned address in it
+		size = ctypes.sizeof(type)
+		memory = (ctypes.c_char * (size + align - 1))()
+		return type.from_buffer(memory, -ctypes.addressof(memory) % align)
+	
+	@staticmethod
+	def alignment(address, limit=4096):
+		'''Return the largest power of two, up to "limit", that an address is a multiple of'''
+		return min(address & -address, limit) if address else limit
+	
+	@staticmethod
+	def memoryat(address, nbytes, format='B'):
+		'''Return a writable memoryview of the memory at an address, or None for null pointers'''
+		if not address:
+			return None
+		# Array types are cached by ctypes, this is faster than calling PyMemoryView_FromMemory through ctypes
+		view = memoryview((ctypes.c_ubyte * nbytes).from_address(address)).cast('B')
+		return view.cast(format) if format != 'B' else view
+	
+	@staticmethod
+	def bufferaddress(view):
+		'''Return the address of the memory of a buffer. Works for read-only buffers too.'''
+		buffer = Utils.Py_buffer()
+		ctypes.pythonapi.PyObject_GetBuffer(ctypes.py_object(view), ctypes.byref(buffer), 0)
+		try:
+			return buffer.buf or 0
+		finally:
+			ctypes.pythonapi.PyBuffer_Release(ctypes.byref(buffer))
+		
 	@staticmethod
 	def ljust(list, width, fillitem=None):
 		'''Padd a list to a mininum size, while keeping existing elements on the left.'''